@@ -0,0 +1,35 @@
+"""Checks that AssetLoader keeps working when queued assets are asked for again more urgently.
+
+    python asset_priority.py
+
+Queues every warm_up asset at IDLE, as the first frame does, then asks for
+some of them again at NEXT and URGENT, as the level menu and hovering a level
+do, while the workers are still decoding. Every asset must be decoded exactly
+once, both workers must still be alive and take() must hand everything over.
+Exits with 1 otherwise.
+"""
+import sys
+import time
+
+import main as game
+
+
+def main():
+    loader = game.AssetLoader(archive=game.assets.archive)
+    items = list(dict.fromkeys(asset for step in game.warm_up for asset in step[0]))
+    loader.prefetch(items, loader.IDLE)
+    loader.prefetch(items[len(items) // 2:], loader.NEXT)
+    loader.prefetch(items[-40:], loader.URGENT)
+    deadline = time.perf_counter() + 30
+    while not loader.ready(items) and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    alive = [thread.is_alive() for thread in loader.threads]
+    taken = [loader.take(*asset) for asset in items]
+    loader.close()
+    failed = not all(alive) or None in taken or loader.decodes != len(items)
+    print(f"{len(items)} assets, {loader.decodes} decodes, workers alive: {alive}" + ("  FAIL" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
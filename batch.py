@@ -0,0 +1,195 @@
+"""Runs many headless games in parallel, for tuning difficulty.
+
+Every combination of --levels, --rounds, --seeds and --policies is one job.
+Jobs are spread over a process pool; each worker imports the game once and
+plays its jobs with no window, no sound and no frame limiting. Per-job
+results are streamed to --out as JSON lines while the batch runs, and the
+aggregate per (level, round, policy) is written to --summary at the end:
+
+    python batch.py --levels 1 2 3 --seeds 0-499 --policies random greedy
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+DIRECTIONS = ["right", "left", "up", "down"]
+
+
+# Scripted policies: policy(state, rng, memory) -> list of actions for the next tick
+def idle_policy(state, rng, memory):
+    return []
+
+
+def random_policy(state, rng, memory):
+    """Holds a random action (or nothing) for 10-40 ticks at a time."""
+    if memory.get("hold", 0) <= 0:
+        memory["actions"] = rng.choice([[d] for d in DIRECTIONS] + [["ice"], ["break"], []])
+        memory["hold"] = rng.randrange(10, 40)
+    memory["hold"] -= 1
+    return memory["actions"]
+
+
+def greedy_policy(state, rng, memory):
+    """Walks toward the nearest fruit, breaking ice or wandering when stuck."""
+    x, y = state["player"]
+    if memory.get("wander", 0) > 0:
+        memory["wander"] -= 1
+        return memory["actions"]
+    if state["player"] == memory.get("last"):
+        memory["stuck"] = memory.get("stuck", 0) + 1
+    else:
+        memory["stuck"] = 0
+    memory["last"] = state["player"]
+    if memory["stuck"] > 20:
+        memory["stuck"] = 0
+        memory["wander"] = rng.randrange(10, 30)
+        memory["actions"] = rng.choice([["break"], [rng.choice(DIRECTIONS)]])
+        return memory["actions"]
+    if not fruits:
+        return []
+    cx, cy = x + 20, y + 29
+    target = min(fruits, key=lambda fruit: abs(fruit.rect.centerx - cx) + abs(fruit.rect.centery - cy))
+    dx, dy = target.rect.centerx - cx, target.rect.centery - cy
+    if abs(dx) >= abs(dy) * 40 / 58:
+        return ["right" if dx > 0 else "left"]
+    return ["down" if dy > 0 else "up"]
+
+
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+def init_worker(chase=False):
+    # Import inside the worker so every process gets its own pygame and sprite groups.
+    # The game loads Resources/ relative to its own folder.
+    global simulation, fruits, levels
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    from headless import simulation
+    from main import fruits, levels
+    simulation.chase = chase
+
+
+def run_job(job):
+    """Plays one job until the level is won, lost or max_ticks run out."""
+    level, round, seed, policy_name, max_ticks = job
+    policy = POLICIES[policy_name]
+    rng = random.Random(seed)
+    memory = {}
+    state = simulation.reset(level, round, seed)
+    start_round = round
+    score = 0
+    fruits_eaten = 0
+    result = "timeout"
+    rounds_cleared = 0
+    clear_tick = None  # the last fruit was eaten; the win animation runs WIN_TICKS more before "won"
+    while state["tick"] < max_ticks:
+        state = simulation.step(policy(state, rng, memory))
+        if state["winning"] and clear_tick is None:
+            clear_tick = state["tick"]
+        if state["result"] is not None:
+            result = state["result"]
+            if result == "won":
+                rounds_cleared = len(levels[level - 1]) - start_round + 1
+            break
+        if state["score"] > score:
+            fruits_eaten += (state["score"] - score) // 50
+            score = state["score"]
+        rounds_cleared = state["round"] - start_round
+    return {
+        "level": level,
+        "round": round,
+        "seed": seed,
+        "policy": policy_name,
+        "result": result,
+        "ticks": state["tick"],
+        "ticks_to_clear": clear_tick if result == "won" else None,
+        "deaths": 1 if result == "lost" else 0,
+        "fruits_eaten": fruits_eaten,
+        "rounds_cleared": rounds_cleared,
+    }
+
+
+def seed_range(text):
+    if "-" in text:
+        first, last = text.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(text)]
+
+
+def summarize(results):
+    groups = {}
+    for r in results:
+        groups.setdefault((r["level"], r["round"], r["policy"]), []).append(r)
+    summary = []
+    for (level, round, policy), runs in sorted(groups.items()):
+        wins = [r for r in runs if r["result"] == "won"]
+        summary.append({
+            "level": level,
+            "round": round,
+            "policy": policy,
+            "games": len(runs),
+            "win_rate": len(wins) / len(runs),
+            "mean_ticks_to_clear": sum(r["ticks_to_clear"] for r in wins) / len(wins) if wins else None,
+            "deaths": sum(r["deaths"] for r in runs),
+            "mean_fruits_eaten": sum(r["fruits_eaten"] for r in runs) / len(runs),
+            "mean_rounds_cleared": sum(r["rounds_cleared"] for r in runs) / len(runs),
+        })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[1])
+    parser.add_argument("--seeds", type=seed_range, nargs="+", default=[list(range(100))],
+                        help="seeds or inclusive ranges such as 0-99")
+    parser.add_argument("--policies", nargs="+", default=["random"], choices=sorted(POLICIES))
+    parser.add_argument("--ticks", type=int, default=20000, help="give up on a game after this many ticks")
+    parser.add_argument("--chase", action="store_true", help="trolls chase the player instead of wandering")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--out", default="batch_results.jsonl")
+    parser.add_argument("--summary", default="batch_summary.json")
+    args = parser.parse_args(argv)
+
+    seeds = sorted(set(itertools.chain.from_iterable(args.seeds)))
+    jobs = [(level, round, seed, policy, args.ticks)
+            for level in args.levels for round in args.rounds for seed in seeds for policy in args.policies]
+
+    results = []
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(args.chase,))
+    with open(args.out, "w") as out:
+        for result in pool.imap_unordered(run_job, jobs, chunksize=max(1, len(jobs) // (args.workers * 8))):
+            results.append(result)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    # close/join rather than the context manager's terminate(), which can hang
+    # on workers that still hold pygame's audio/video threads
+    pool.close()
+    pool.join()
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results)
+    with open(args.summary, "w") as file:
+        json.dump(summary, file, indent=2)
+
+    ticks = sum(r["ticks"] for r in results)
+    print(f"{len(jobs)} games, {ticks} ticks in {elapsed:.1f}s ({ticks / elapsed:.0f} ticks/s) on {args.workers} workers")
+    for row in summary:
+        clear = f"{row['mean_ticks_to_clear']:.0f}" if row["mean_ticks_to_clear"] is not None else "-"
+        print(f"lv{row['level']} r{row['round']} {row['policy']:>7}: win {row['win_rate']:.0%}, "
+              f"ticks to clear {clear}, deaths {row['deaths']}, fruits {row['mean_fruits_eaten']:.1f}, "
+              f"rounds {row['mean_rounds_cleared']:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Benchmarks the game logic headless, round by round, against a stored baseline.
+
+    python bench.py                 # run and compare with bench_baseline.json
+    python bench.py --save          # run and make this the new baseline
+    python bench.py --ticks 2000 --cases idle crowded
+
+Every case runs on each round of each level with a fixed seed:
+
+    load      simulation.reset() straight into the round
+    restart   restart(), as the minimenu button does (always round 1, so once per level)
+    idle      ticks with no input
+    ice       ticks spraying and breaking ice in each direction
+    crowded   ticks with a troll and a fruit on every free cell, the player walled in
+
+and once with 10, 100 and 500 ice blocks:
+
+    lookup    IceGrid.at() and collides() on cells with and without a block
+
+The lookups hit the same cells whatever the number of blocks, so their rate
+should not drop as blocks are added; a 500-block rate more than --tolerance
+below the 10-block one is flagged too.
+
+Each case is timed --runs times, each run repeating the case from its setup
+until at least --min-time seconds were spent in it, and the best run's ticks
+(or loads/restarts) per second is reported. Runs go round all the cases in
+turn, so a slow stretch of the machine does not hit every run of one case.
+Each case then runs once more under tracemalloc, reporting the peak memory
+allocated above the starting point. A rate more than --tolerance below the
+baseline, or an allocation peak more than 20% above it, is flagged as a
+regression and makes the exit code 1. Timings depend on the machine, so save
+a baseline on the machine you compare on. Even then, on a shared machine
+the best rate of a case moved by up to a third from one process to the next,
+hence the default --tolerance of 0.4; pass a smaller one on a quiet machine.
+Allocations are the same from run to run.
+"""
+import argparse
+import gc
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from headless import simulation
+import main as game
+
+SEED = 0
+DIRECTIONS = ["right", "left", "up", "down"]
+ALLOC_SLACK = 4  # KB of allocation peak jitter that is never flagged
+ALLOC_TOLERANCE = 0.2
+ICE_COUNTS = [10, 100, 500]
+LATTICE = 25  # columns of the lookup case's ice
+
+
+def idle_script(tick):
+    return []
+
+
+def ice_script(tick):
+    """Turns to a new direction every 120 ticks, spraying ice for 60 and breaking it for 59."""
+    phase = tick % 120
+    if phase == 0:
+        return [DIRECTIONS[tick // 120 % 4]]
+    return ["ice"] if phase <= 60 else ["break"]
+
+
+def crowd():
+    """Puts a troll and a fruit on every free cell, with ice on the player's neighbours so nothing reaches them."""
+    player = game.players.sprites()[0]
+    start = game.IceGrid.cell(*player.rect.topleft)
+    kind = game.levels[simulation.level - 1][simulation.round - 1].fruit
+    for col in range(game.board.columns):
+        for row in range(game.board.rows):
+            cell = (col, row)
+            if cell == start or not game.walkable(cell, game.iceblocks):
+                continue
+            x, y = game.WALL_SIZE + col * game.ICE_WIDTH, game.WALL_SIZE + row * game.ICE_HEIGHT
+            if abs(col - start[0]) + abs(row - start[1]) == 1:
+                game.iceblocks.add(game.IceBlocks(x, y))
+                continue
+            if cell not in game.trolls.holders:
+                simulation.add_troll(x + game.ICE_WIDTH, y)  # trolls are placed by their topright
+            if cell not in game.fruits.cells:
+                game.fruits.add(game.Fruits(x + game.ICE_WIDTH // 2, y + game.ICE_HEIGHT // 2, kind,
+                                            game.fruits, game.iceblocks))
+
+
+def ticks(script):
+    def run(count):
+        for tick in range(count):
+            simulation.step(script(tick))
+    return run
+
+
+def loads(level, round):
+    def run(count):
+        for _ in range(count):
+            simulation.reset(level, round, SEED)
+    return run
+
+
+def restarts(count):
+    for _ in range(count):
+        game.restart()
+
+
+def ice_lattice(count):
+    """Return a scratch IceGrid with count blocks, row by row from cell (0, 0), and the lookup case's queries."""
+    def position(index):
+        col, row = index % LATTICE, index // LATTICE
+        return game.WALL_SIZE + col * game.ICE_WIDTH, game.WALL_SIZE + row * game.ICE_HEIGHT
+
+    grid = game.IceGrid(*(game.IceBlocks(*position(index)) for index in range(count)))
+    # Ten cells with a block and ten past the last block of the biggest grid, the same for every count
+    queries = []
+    for index in list(range(0, 10)) + list(range(max(ICE_COUNTS), max(ICE_COUNTS) + 10)):
+        x, y = position(index)
+        queries.append(((x, y), pygame.Rect(x + 4, y + 4, game.ICE_WIDTH, game.ICE_HEIGHT)))
+    return grid, queries
+
+
+def lookups(count):
+    grid, queries = None, []
+
+    def setup():
+        nonlocal grid, queries
+        grid, queries = ice_lattice(count)
+
+    def run(count):
+        for pos, rect in itertools.islice(itertools.cycle(queries), count):
+            grid.at(pos)
+            grid.collides(rect)
+    return setup, run
+
+
+def case(name, level, round, options):
+    """Return (setup, run, count, unit) for a case on one round."""
+    def setup():
+        simulation.reset(level, round, SEED)
+
+    def crowded_setup():
+        setup()
+        crowd()
+
+    if name == "load":
+        return setup, loads(level, round), options.repeats, "loads"
+    if name == "restart":
+        return setup, restarts, options.repeats, "restarts"
+    if name == "idle":
+        return setup, ticks(idle_script), options.ticks, "ticks"
+    if name == "ice":
+        return setup, ticks(ice_script), options.ticks, "ticks"
+    if name == "crowded":
+        return crowded_setup, ticks(idle_script), options.ticks, "ticks"
+    raise ValueError(name)
+
+
+def timed(setup, run, count, min_time):
+    """Repeats the case from its setup until min_time seconds were spent in it; return the rate."""
+    elapsed = done = 0
+    while elapsed < min_time:
+        setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(count)
+        elapsed += time.perf_counter() - start
+        done += count
+    return done / elapsed
+
+
+def allocated(setup, run, count):
+    setup()
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    run(count)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round((peak - base) / 1024, 1)
+
+
+def compare(result, baseline, tolerance):
+    """Return the regressions of result against its baseline entry, as text."""
+    problems = []
+    if result["rate"] < baseline["rate"] * (1 - tolerance):
+        problems.append(f"{result['rate'] / baseline['rate'] - 1:+.0%} rate")
+    if result["alloc_kb"] > baseline["alloc_kb"] * (1 + ALLOC_TOLERANCE) + ALLOC_SLACK:
+        problems.append(f"{result['alloc_kb'] - baseline['alloc_kb']:+.1f} KB allocated")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", default=["load", "restart", "idle", "ice", "crowded", "lookup"],
+                        choices=["load", "restart", "idle", "ice", "crowded", "lookup"])
+    parser.add_argument("--ticks", type=int, default=600, help="ticks per tick case and round")
+    parser.add_argument("--repeats", type=int, default=20, help="loads or restarts per round")
+    parser.add_argument("--lookups", type=int, default=2000, help="lookups per lookup case")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per case, the fastest is kept")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each timed run lasts at least")
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.4, help="allowed slowdown")
+    options = parser.parse_args(argv)
+
+    try:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+
+    cases = {}
+    for name in options.cases:
+        if name == "lookup":
+            for count in ICE_COUNTS:
+                cases[f"ice{count} lookup"] = (*lookups(count), options.lookups, "lookups")
+            continue
+        for level in range(1, len(game.levels) + 1):
+            rounds = [1] if name == "restart" else range(1, len(game.levels[level - 1]) + 1)
+            for number in rounds:
+                key = f"lv{level} {name}" if name == "restart" else f"lv{level} r{number} {name}"
+                cases[key] = case(name, level, number, options)
+
+    # Every run goes through all cases, so a slow stretch of the machine costs each case one run at most
+    rates = dict.fromkeys(cases, 0)
+    for _ in range(options.runs):
+        for key, (setup, run, count, unit) in cases.items():
+            rates[key] = max(rates[key], timed(setup, run, count, options.min_time))
+
+    results = {}
+    regressions = 0
+    for key, (setup, run, count, unit) in cases.items():
+        result = results[key] = {"rate": round(rates[key], 1), "alloc_kb": allocated(setup, run, count)}
+        line = f"{key:>18}: {result['rate']:9.0f} {unit}/s, {result['alloc_kb']:7.1f} KB allocated"
+        if key in baseline and not options.save:
+            problems = compare(result, baseline[key], options.tolerance)
+            line += f"  (baseline {baseline[key]['rate']:.0f}/s, {baseline[key]['alloc_kb']:.1f} KB)"
+            if problems:
+                regressions += 1
+                line += "  REGRESSION: " + ", ".join(problems)
+        print(line)
+
+    if "lookup" in options.cases:
+        fewest, most = (rates[f"ice{count} lookup"] for count in (ICE_COUNTS[0], ICE_COUNTS[-1]))
+        line = f"lookups with {ICE_COUNTS[-1]} blocks at {most / fewest:.0%} of the rate with {ICE_COUNTS[0]}"
+        if most < fewest * (1 - options.tolerance):
+            regressions += 1
+            line += "  REGRESSION: lookups scale with the number of blocks"
+        print(line)
+
+    if options.save:
+        baseline.update(results)
+        with open(options.baseline, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"saved {len(results)} results to {options.baseline}")
+    elif regressions:
+        print(f"{regressions} regressions against {options.baseline}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
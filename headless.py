@@ -0,0 +1,18 @@
+"""Headless access to the game logic, for bots and regression runs.
+
+Importing this module picks the SDL dummy video and audio drivers before
+main.py starts pygame, so no window is opened and no sound is played.
+The sprite groups live in main.py, so there is one simulation per process:
+
+    from headless import simulation
+    simulation.reset(1)
+    state = simulation.step(["right", "ice"])
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import ACTIONS, Recording, Simulation, simulation  # noqa: E402
+
+simulation.sound = False
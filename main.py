@@ -1,6 +1,15 @@
 import pygame
+import concurrent.futures
+import json
+import mmap
+import numpy
+import os
+import queue
 import random
 import sys
+import threading
+import time
+import zlib
 
 pygame.init()
 pygame.mixer.init()
@@ -18,24 +27,232 @@ screens = ["start","levels", "paused", "gaming", "help", "credits"]
 
 active_screen = "start"
 
-# Load background
-background_surface = pygame.image.load("Resources/background.png").convert_alpha()
-background_rect = background_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-
 # Iglu (Invisible Obstacle)
 iglu_inv_surf = pygame.Surface((160, 173), pygame.SRCALPHA)
 iglu_inv_surf.fill((0, 0, 0, 0)) 
 iglu_inv_rect = iglu_inv_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
 
+# Animation frames packed by pack_assets.py (optional: without them every frame is its own file)
+ARCHIVE = "Resources/frames.atlas"
+ARCHIVE_INDEX = "Resources/frames.json"
+
+class AssetArchive:
+    """Frames packed into atlases: a memory-mapped file of raw pixels and a JSON index.
+
+    get() returns a packed file as a subsurface of its atlas, or None if it is not packed.
+    """
+    def __init__(self, path=ARCHIVE, index_path=ARCHIVE_INDEX):
+        self.path = path
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        self.frames = None  # file -> (atlas, rect), once opened
+        self.map = None
+
+    def open(self):
+        self.frames = {}
+        if not (os.path.exists(self.path) and os.path.exists(self.index_path)):
+            return
+        with open(self.index_path, encoding="utf-8") as file:
+            index = json.load(file)
+        with open(self.path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        atlases = []
+        for atlas in index["atlases"]:
+            width, height = atlas["size"]
+            pixels = memoryview(self.map)[atlas["offset"]:atlas["offset"] + width * height * 4]
+            atlases.append(pygame.image.frombuffer(pixels, (width, height), index["format"]))
+        for path, (atlas, x, y, width, height) in index["frames"].items():
+            self.frames[path] = (atlases[atlas], pygame.Rect(x, y, width, height))
+
+    def get(self, path):
+        with self.lock:
+            if self.frames is None:
+                self.open()
+            if path not in self.frames:
+                return None
+            atlas, rect = self.frames[path]
+            return atlas.subsurface(rect)
+
+# Asset files decoded on worker threads
+class AssetLoader:
+    """Decodes images and sounds on worker threads, the most urgent first.
+
+    An asset is a (path, how) pair; whoever take()s it converts it on the main thread.
+    """
+    URGENT, NEXT, IDLE = 0, 1, 2
+
+    def __init__(self, workers=2, archive=None):
+        self.workers = workers
+        self.archive = archive or AssetArchive()
+        self.threads = []
+        self.queue = queue.PriorityQueue()
+        self.lock = threading.Lock()
+        self.futures = {}  # asset -> Future, until it is taken
+        self.priority = {}  # asset -> most urgent priority it is queued with
+        self.taken = set()
+        self.order = 0  # same priority: first asked, first decoded
+        self.decodes = 0
+
+    def decode(self, path, how):
+        if how == "sound":
+            return pygame.mixer.Sound(path)
+        image = self.archive.get(path)
+        if image is None:
+            image = pygame.image.load(path)
+        if how == "scale2x":
+            return pygame.transform.scale2x(image)
+        if how is not None:
+            return pygame.transform.scale_by(image, how)
+        return image
+
+    def prefetch(self, assets, priority=IDLE):
+        with self.lock:
+            for asset in assets:
+                if asset in self.taken:
+                    continue
+                future = self.futures.get(asset)
+                if future is None:
+                    future = self.futures[asset] = concurrent.futures.Future()
+                elif future.running() or future.done() or self.priority[asset] <= priority:
+                    continue
+                self.priority[asset] = priority
+                self.order += 1
+                self.queue.put((priority, self.order, asset))
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self.work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def work(self):
+        while True:
+            priority, order, asset = self.queue.get()
+            if asset is None:
+                return
+            with self.lock:
+                future = self.futures.get(asset)
+                # Moving an asset up the queue leaves its older entry behind, already decoded or being decoded
+                if future is None or future.running() or future.done() or not future.set_running_or_notify_cancel():
+                    continue
+            self.run(future, asset)
+
+    def run(self, future, asset):
+        try:
+            future.set_result(self.decode(*asset))
+        except Exception as error:  # raised again by take(), on the main thread
+            future.set_exception(error)
+        with self.lock:
+            self.decodes += 1
+
+    def ready(self, assets):
+        """True when take() would not have to decode or wait for any of these."""
+        with self.lock:
+            return all(asset in self.taken or (asset in self.futures and self.futures[asset].done())
+                       for asset in assets)
+
+    def take(self, path, how=None):
+        """Return the decoded asset, which the loader then forgets: the caller keeps it."""
+        asset = (path, how)
+        with self.lock:
+            future = self.futures.pop(asset, None)
+            self.taken.add(asset)
+            if future is None:
+                future = concurrent.futures.Future()
+            mine = not (future.running() or future.done()) and future.set_running_or_notify_cancel()
+        if mine:
+            self.run(future, asset)
+        return future.result()
+
+    def close(self):
+        """Lets the workers finish what they are decoding and stops them."""
+        for order, thread in enumerate(self.threads):
+            self.queue.put((-1, order, None))
+        for thread in self.threads:
+            thread.join()
+        self.threads.clear()
+
+assets = AssetLoader()
+
+# Animation frames shared by every Player and Troll
+COLORKEY = (49, 202, 49)
+
+class FrameCache:
+    """Converts each animation frame once for the whole process; the assets loader decodes and scales it."""
+    animations = {
+        ("choco", "andando", "fre"): ("Resources/choco/choco_andando/frente", 8),
+        ("choco", "andando", "tra"): ("Resources/choco/choco_andando/tras", 8),
+        ("choco", "andando", "esq"): ("Resources/choco/choco_andando/esquerda", 8),
+        ("choco", "andando", "dir"): ("Resources/choco/choco_andando/direita", 8),
+        ("choco", "comendo", "fre"): ("Resources/choco/choco_comendo/frente", 7),
+        ("choco", "comendo", "tra"): ("Resources/choco/choco_comendo/tras", 7),
+        ("choco", "comendo", "esq"): ("Resources/choco/choco_comendo/esquerda", 7),
+        ("choco", "comendo", "dir"): ("Resources/choco/choco_comendo/direita", 7),
+        ("choco", "cuspindo", "fre"): ("Resources/choco/choco_gelo/de frente", 12),
+        ("choco", "cuspindo", "tra"): ("Resources/choco/choco_gelo/de tras", 12),
+        ("choco", "cuspindo", "esq"): ("Resources/choco/choco_gelo/da esquerda", 8),
+        ("choco", "cuspindo", "dir"): ("Resources/choco/choco_gelo/da direita", 8),
+        ("choco", "quebrando", None): ("Resources/choco/choco_quebrando_gelo", 8),
+        ("choco", "morrendo", None): ("Resources/choco/choco_morte", 15),
+        ("choco", "vencendo", None): ("Resources/choco/choco_vencendo", 6),
+        ("troll", "andando", "fre"): ("Resources/troll/frente", 8),
+        ("troll", "andando", "tra"): ("Resources/troll/tras", 8),
+        ("troll", "andando", "esq"): ("Resources/troll/esquerda", 8),
+        ("troll", "andando", "dir"): ("Resources/troll/direita", 8),
+        ("troll", "duvida", None): ("Resources/troll/duvida", 6),
+    }
+
+    def __init__(self):
+        self.frames = {}
+        self.hits = 0
+        self.decodes = 0
+
+    def get(self, character, action, direction=None):
+        """Return the frame list for (character, action, direction), decoding it on first use."""
+        key = (character, action, direction)
+        if key in self.frames:
+            self.hits += 1
+            return self.frames[key]
+        lista = []
+        for path, how in self.files(key):
+            image = assets.take(path, how).convert()
+            image.set_colorkey(COLORKEY)
+            lista.append(image)
+            self.decodes += 1
+        self.frames[key] = lista
+        return lista
+
+    def files(self, key):
+        folder, count = self.animations[key]
+        return [(f"{folder}/part{i}.png", "scale2x") for i in range(1, count + 1)]
+
+    def stats(self):
+        return f"{self.hits} hits / {self.decodes} decodes"
+
+animation_frames = FrameCache()
+
 # Classes
 class Fruits(pygame.sprite.Sprite):
+    surfaces = {}  # one converted image per fruit kind, shared by every instance
+    pool = {}  # released fruits per kind, handed back out by __new__
+    bob_ticks = 80  # ticks for a fruit to bob up and back down to where it started
+    path = "Resources/fruits/{}.webp"
+
+    def __new__(cls, x, y, fruit, *args):
+        if cls.pool.get(fruit):
+            return cls.pool[fruit].pop()
+        return super().__new__(cls)
+
     def __init__(self,x,y,fruit,fruits, iceblocks):
         super().__init__()
-        self.image = pygame.image.load(f"Resources/fruits/{fruit}.webp")
+        if fruit not in Fruits.surfaces:
+            Fruits.surfaces[fruit] = assets.take(Fruits.path.format(fruit)).convert_alpha()
+        self.fruit = fruit
+        self.released = False
+        self.image = Fruits.surfaces[fruit]
         self.rect = self.image.get_rect(center=(x, y))
         self.adicional = 1
         self.limite = 50
         self.counter = 0
+        self.behind = 0  # ticks not animated while out of the camera's view
         self.fruits = fruits
         self.icegroup = iceblocks
 
@@ -50,23 +267,38 @@ class Fruits(pygame.sprite.Sprite):
     def reset_animation(self):
         self.counter = 0
         self.adicional = 1
+        self.behind = 0
 
 
+    @classmethod
+    def release(cls, fruit):
+        """Takes a fruit off the board and keeps it for the next Fruits(...) of the same kind."""
+        fruit.kill()
+        if not fruit.released:
+            fruit.released = True
+            cls.pool.setdefault(fruit.fruit, []).append(fruit)
+
     def update(self):
-        self.animation()      
+        # Fora da tela não anima; ao voltar, recupera os ticks perdidos (o movimento se repete a cada bob_ticks)
+        if not camera.sees(self.rect):
+            self.behind += 1
+            return
+        for _ in range(self.behind % self.bob_ticks):
+            self.animation()
+        self.behind = 0
+        self.animation()
 
 
 class Troll(pygame.sprite.Sprite):
     def __init__(self,x,y,iceblocks,trolls,dic=(0, 0, "frente", 0)):
         super().__init__()
-        self.image =  pygame.transform.scale2x(pygame.image.load("Resources/troll/frente/part1.png"))
-        self.image.set_colorkey((49, 202, 49))  
+        self.andando_frente = animation_frames.get("troll", "andando", "fre")
+        self.andando_tras = animation_frames.get("troll", "andando", "tra")
+        self.andando_direita = animation_frames.get("troll", "andando", "dir")
+        self.andando_esquerda = animation_frames.get("troll", "andando", "esq")
+        self.duvidoso = animation_frames.get("troll", "duvida")
+        self.image = self.andando_frente[0]
         self.rect = self.image.get_rect(topright = (x,y))
-        self.andando_frente = [pygame.transform.scale2x(pygame.image.load(f"Resources/troll/frente/part{i}.png")) for i in range(1,9)]
-        self.andando_tras = [pygame.transform.scale2x(pygame.image.load(f"Resources/troll/tras/part{i}.png")) for i in range(1,9)]
-        self.andando_direita = [pygame.transform.scale2x(pygame.image.load(f"Resources/troll/direita/part{i}.png")) for i in range(1,9)]
-        self.andando_esquerda = [pygame.transform.scale2x(pygame.image.load(f"Resources/troll/esquerda/part{i}.png")) for i in range(1,9)]
-        self.duvidoso = [pygame.transform.scale2x(pygame.image.load(f"Resources/troll/duvida/part{i}.png")) for i in range(1,7)]
         self.ice_group = iceblocks
         self.trolls = trolls
         self.andando = True
@@ -81,6 +313,8 @@ class Troll(pygame.sprite.Sprite):
         self.speed = 1
         self.speed_end = 0
         self.c = 0
+        self.rng = random  # Simulation.reset swaps in the session's seeded Random
+        self.flow = None  # FlowField to chase the player with, or None to wander
 
     def animation_andando(self):
         if self.fre:
@@ -91,21 +325,50 @@ class Troll(pygame.sprite.Sprite):
             self.image = self.andando_esquerda[int(self.index_movimento)]
         elif self.dir:
             self.image = self.andando_direita[int(self.index_movimento)]
-        self.image.set_colorkey((49, 202, 49))  
         self.index_movimento += 0.15
         if self.index_movimento >= 8:
             self.index_movimento = 0
         
     def duvidoso_animation(self):
         self.image = self.duvidoso[int(self.duvidoso_index)]
-        self.image.set_colorkey((49, 202, 49))  
         self.duvidoso_index += 0.1
         if self.duvidoso_index >= 6:
             self.duvidoso_index = 0
         self.possible_way()
 
+    # Passo, em células, de cada direção
+    steps = {"tra": (0, -1), "fre": (0, 1), "esq": (-1, 0), "dir": (1, 0)}
+    opposite = {"tra": "fre", "fre": "tra", "esq": "dir", "dir": "esq"}
+
+    def direction(self):
+        for direction in ("dir", "esq", "fre", "tra"):
+            if getattr(self, direction):
+                return direction
+        return None
+
+    def cell_towards(self, direction):
+        col, row = IceGrid.cell(*self.rect.topleft)
+        step = self.steps[direction]
+        return (col + step[0], row + step[1])
+
+    def can_enter(self, cell):
+        return walkable(cell, self.ice_group) and self.trolls.free(cell, self)
+
+    def go(self, direction):
+        """Sets off toward direction, which is a cell this troll already holds."""
+        self.dir, self.esq, self.fre, self.tra = 0, 0, 0, 0  # Reseta direções
+        setattr(self, direction, 1)  # Ativa a direção escolhida
+
+        # Define tempo de movimento baseado na direção
+        if direction in ["tra", "fre"]:
+            self.counter = 58
+        else:
+            self.counter = 40
+        self.andando = True
+        self.duvido = False
+
     def possible_way(self):
-        """Finds a valid way for troll. Else, troll becomes duvidoso."""
+        """Finds a valid way for troll and claims its cell. Else, troll becomes duvidoso."""
         x, y = self.rect.topleft
 
         # Define direções possíveis
@@ -116,34 +379,38 @@ class Troll(pygame.sprite.Sprite):
             "dir": (x + ICE_WIDTH, y)
         }
 
-        # Filtra apenas as direções válidas
-        valid_choices = []
-        for direction, pos in ways.items():
-            if (
-                not any(iceblock.rect.topleft == pos for iceblock in self.ice_group) and  # Sem gelo
-                not any(trolle.rect.topleft == pos for trolle in self.trolls if trolle != self) and  # Sem trolls
-                50 <= pos[0] < SCREEN_WIDTH - 50 and 50 <= pos[1] < SCREEN_HEIGHT - 50  # Dentro dos limites
-            ):
-                valid_choices.append(direction)
+        # Filtra apenas as direções válidas: sem gelo, sem iglu, dentro dos limites e sem outro troll
+        valid_choices = [direction for direction in ways if self.can_enter(self.cell_towards(direction))]
+
+        # Perseguindo: fica só com as direções que mais se aproximam do jogador
+        if valid_choices and self.flow is not None:
+            valid_choices = self.flow.closest({direction: ways[direction] for direction in valid_choices})
 
         # Se houver direções válidas, escolhe uma aleatória
         if valid_choices:
-            escolha = random.choice(valid_choices)
-            self.dir, self.esq, self.fre, self.tra = 0, 0, 0, 0  # Reseta direções
-            setattr(self, escolha, 1)  # Ativa a direção escolhida
-
-            # Define tempo de movimento baseado na direção
-            if escolha in ["tra", "fre"]:
-                self.counter = 58
-            else:
-                self.counter = 40
-            self.andando = True
-            self.duvido = False
+            escolha = self.rng.choice(valid_choices)
+            self.trolls.claim(self.cell_towards(escolha), self)
+            self.go(escolha)
         else:
             self.duvido = True
             self.andando = False
 
     def update(self):
+        # Gelo posto no caminho depois que o troll saiu: volta para a célula de onde veio
+        if self.ice_group.collides(self.rect):
+            self.rect.bottomleft = self.last_pos
+            if not on_lattice(self.rect.topleft):
+                self.go(self.opposite[self.direction()])
+
+        # Em cada célula: libera a anterior e reserva a próxima antes de andar
+        if on_lattice(self.rect.topleft) and not self.duvido:
+            self.trolls.release(self, keep=IceGrid.cell(*self.rect.topleft))
+            direction = self.direction()
+            if self.flow is not None or direction is None or not self.can_enter(self.cell_towards(direction)):
+                self.possible_way()
+            else:
+                self.trolls.claim(self.cell_towards(direction), self)
+
         if self.counter > 0 and not self.duvido:
             self.andando = True
 
@@ -157,35 +424,18 @@ class Troll(pygame.sprite.Sprite):
             elif self.esq:
                 self.counter = 58
 
-        # Impede que o troll saia das bordas
-        if self.rect.right > SCREEN_WIDTH-50 or self.rect.left < 50 or self.rect.top < 50 or self.rect.bottom > SCREEN_HEIGHT-50:
-            self.rect.bottomleft = self.last_pos
-            self.possible_way()
-
-        # Colisão com o iglu
-        if self.rect.colliderect(iglu_inv_rect):
-            self.rect.bottomleft = self.last_pos
-            self.possible_way()
-
-        # Colisão com outros trolls
-        for trolle in self.trolls:
-            if trolle != self and self.rect.colliderect(trolle):
-                self.possible_way()
-                self.rect.bottomleft = self.last_pos
-                
-
-        # Colisão com blocos de gelo
-        for iceblock in self.ice_group:
-            if self.rect.colliderect(iceblock):
-                self.rect.bottomleft = self.last_pos
-                self.possible_way()
-
+        # Fora da tela só a escolha de caminho roda, sem trocar de quadro
+        visible = camera.sees(self.rect)
         if self.andando:
             self.duvido = False
-            self.animation_andando()
+            if visible:
+                self.animation_andando()
         
         if self.duvido:
-            self.duvidoso_animation()
+            if visible:
+                self.duvidoso_animation()
+            else:
+                self.possible_way()
             self.andando = False
 
         # Atualiza a última posição
@@ -193,33 +443,461 @@ class Troll(pygame.sprite.Sprite):
 
 
 class IceBlocks(pygame.sprite.Sprite):
+    surface = None  # converted image shared by every block until its alpha changes
+    pool = []  # released blocks, handed back out by __new__
+    path = "Resources/Ice_Block_horizontal.webp"
+
+    def __new__(cls, *args):
+        if cls.pool:
+            return cls.pool.pop()
+        return super().__new__(cls)
+
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.transform.scale2x(pygame.image.load("Resources/Ice_Block_horizontal.webp"))
+        if IceBlocks.surface is None:
+            IceBlocks.surface = assets.take(IceBlocks.path, "scale2x").convert_alpha()
+        self.released = False
+        self.image = IceBlocks.surface
         self.rect = self.image.get_rect(topleft=(x, y))
 
+    def set_alpha(self, alpha):
+        """Changes this block's alpha, copying the shared image the first time."""
+        if alpha is None:
+            self.image = IceBlocks.surface
+            return
+        if self.image is IceBlocks.surface:
+            self.image = IceBlocks.surface.copy()
+        self.image.set_alpha(alpha)
+
+    @classmethod
+    def release(cls, iceblock):
+        """Takes a block off the board and keeps it for the next IceBlocks(...)."""
+        iceblock.kill()
+        if not iceblock.released:
+            iceblock.released = True
+            cls.pool.append(iceblock)
+
+
+class TrackedGroup(pygame.sprite.Group):
+    """Sprite group that bumps a version number whenever a sprite joins or leaves it."""
+    def __init__(self, *sprites):
+        self.version = 0
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        self.version += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.version += 1
+
+
+class IceGrid(TrackedGroup):
+    """Sprite group of ice blocks indexed by cell on the ICE_WIDTH x ICE_HEIGHT lattice.
+
+    A block is registered in every cell its rect overlaps.
+    """
+    def __init__(self, *sprites, board=None):
+        self.cells = {}
+        self.board = board  # the Board whose ICE bits this group keeps, None for a scratch grid
+        super().__init__(*sprites)
+
+    @staticmethod
+    def cell(x, y):
+        return ((x - WALL_SIZE) // ICE_WIDTH, (y - WALL_SIZE) // ICE_HEIGHT)
+
+    @staticmethod
+    def cells_for(rect):
+        left, top = IceGrid.cell(rect.left, rect.top)
+        right, bottom = IceGrid.cell(rect.right - 1, rect.bottom - 1)
+        return [(col, row) for col in range(left, right + 1) for row in range(top, bottom + 1)]
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        for cell in self.cells_for(sprite.rect):
+            self.cells.setdefault(cell, []).append(sprite)
+            if self.board is not None:
+                self.board.mark(cell, Board.ICE, True)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        for cell in self.cells_for(sprite.rect):
+            blocks = self.cells.get(cell)
+            if blocks and sprite in blocks:
+                blocks.remove(sprite)
+                if not blocks:
+                    del self.cells[cell]
+                    if self.board is not None:
+                        self.board.mark(cell, Board.ICE, False)
+
+    def at(self, pos):
+        """Return the ice block whose top-left corner is pos, or None."""
+        for iceblock in self.cells.get(self.cell(*pos), ()):
+            if iceblock.rect.topleft == pos:
+                return iceblock
+        return None
+
+    def collides(self, rect):
+        """Check if rect overlaps any ice block."""
+        for cell in self.cells_for(rect):
+            for iceblock in self.cells.get(cell, ()):
+                if rect.colliderect(iceblock.rect):
+                    return True
+        return False
+
+    def colliding(self, rect):
+        """Return every ice block that overlaps rect."""
+        found = []
+        for cell in self.cells_for(rect):
+            for iceblock in self.cells.get(cell, ()):
+                if iceblock not in found and rect.colliderect(iceblock.rect):
+                    found.append(iceblock)
+        return found
+
+    def walk(self, pos, step):
+        """Return the unbroken line of ice blocks starting one step away from pos."""
+        x, y = pos
+        dx, dy = step
+        line = []
+        while True:
+            x += dx
+            y += dy
+            iceblock = self.at((x, y))
+            if iceblock is None:
+                return line
+            line.append(iceblock)
+
+
+class IceTransparency:
+    """Keeps the set of ice blocks covering fruits and fades only those.
+
+    The set is only rebuilt when a block or a fruit joins or leaves its group.
+    """
+    def __init__(self, fruits, iceblocks, alpha=200):
+        self.fruits = fruits
+        self.iceblocks = iceblocks
+        self.alpha = alpha
+        self.covering = set()
+        self.seen = None
+        self.checks = 0  # fruits looked up in the ice grid during the last update
+        self.rebuilds = 0
+
+    def update(self):
+        self.checks = 0
+        versions = (self.fruits.version, self.iceblocks.version)
+        if versions == self.seen:
+            return
+        self.seen = versions
+        self.rebuilds += 1
+        covering = set()
+        for fruit in self.fruits:
+            self.checks += 1
+            covering.update(self.iceblocks.colliding(fruit.rect))
+        for iceblock in covering:
+            # A pooled block handed back out by IceBlocks(...) is opaque again, even if it covered a fruit before
+            if iceblock not in self.covering or iceblock.image is IceBlocks.surface:
+                iceblock.set_alpha(self.alpha)
+        for iceblock in self.covering - covering:
+            iceblock.set_alpha(None)
+        self.covering = covering
+
+
+class FruitGrid(TrackedGroup):
+    """Sprite group of fruits indexed by the cell each one was put in.
+
+    A fruit only bobs a few pixels, so a rect's cells and their neighbours hold every fruit touching it.
+    """
+    def __init__(self, *sprites, board=None):
+        self.cells = {}
+        self.home = {}  # fruit -> (cell, version when added), the version keeping group order
+        self.board = board  # the Board whose FRUIT bits this group keeps, None for a scratch grid
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        cell = IceGrid.cell(*sprite.rect.center)
+        self.home[sprite] = (cell, self.version)
+        self.cells.setdefault(cell, []).append(sprite)
+        if self.board is not None:
+            self.board.mark(cell, Board.FRUIT, True)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        cell, version = self.home.pop(sprite)
+        self.cells[cell].remove(sprite)
+        if not self.cells[cell]:
+            del self.cells[cell]
+            if self.board is not None:
+                self.board.mark(cell, Board.FRUIT, False)
+
+    def colliding(self, rect):
+        """Return the fruits overlapping rect, in group order."""
+        left, top = IceGrid.cell(rect.left, rect.top)
+        right, bottom = IceGrid.cell(rect.right - 1, rect.bottom - 1)
+        found = []
+        for col in range(left - 1, right + 2):
+            for row in range(top - 1, bottom + 2):
+                for fruit in self.cells.get((col, row), ()):
+                    if rect.colliderect(fruit.rect):
+                        found.append(fruit)
+        found.sort(key=lambda fruit: self.home[fruit][1])
+        return found
+
+
+# Board: the cells inside the walls, and the iglu in the middle that nobody walks into
+class Board:
+    """Size of the playing field, in board pixels (walls included) and in cells, and what is in each cell.
+
+    cells is a uint8 array indexed [col, row] holding ICE, FRUIT, TROLL, PLAYER and IGLU bits.
+    """
+    ICE, FRUIT, TROLL, PLAYER, IGLU = 1, 2, 4, 8, 16
+
+    def __init__(self, columns, rows):
+        self.backgrounds = {}  # (columns, rows) -> (surface, rect), for boards that do not fit the window art
+        self.resize(columns, rows)
+
+    def resize(self, columns, rows):
+        """Changes the board's size; the cells start empty but for the iglu."""
+        self.columns, self.rows = columns, rows
+        self.rect = pygame.Rect(0, 0, 2 * WALL_SIZE + columns * ICE_WIDTH, 2 * WALL_SIZE + rows * ICE_HEIGHT)
+        self.iglu = iglu_inv_rect.copy()
+        self.iglu.center = self.rect.center
+        self.iglu_cells = set(IceGrid.cells_for(self.iglu))
+        self.cells = numpy.zeros((columns, rows), numpy.uint8)
+        self.player_cell = None
+        for cell in self.iglu_cells:
+            self.mark(cell, self.IGLU, True)
+
+    def mark(self, cell, kind, present):
+        """Sets or clears the kind bit of a cell. Cells off the board are ignored."""
+        col, row = cell
+        if 0 <= col < self.columns and 0 <= row < self.rows:
+            if present:
+                self.cells[col, row] |= kind
+            else:
+                self.cells[col, row] &= 0xFF ^ kind
+
+    def place_player(self, rect):
+        """Moves the PLAYER bit to the cell under rect's center."""
+        cell = IceGrid.cell(*rect.center)
+        if cell != self.player_cell:
+            if self.player_cell is not None:
+                self.mark(self.player_cell, self.PLAYER, False)
+            self.mark(cell, self.PLAYER, True)
+            self.player_cell = cell
+
+    def free(self, blocked=ICE | IGLU | TROLL):
+        """[col, row] mask of the cells holding none of the blocked bits."""
+        return (self.cells & blocked) == 0
+
+    def fruits_per_region(self, across=2, down=2):
+        """Cells with fruit in each of across x down regions of the board, as an [across, down] array."""
+        fruit = ((self.cells & self.FRUIT) != 0).astype(numpy.int32)
+        cols = [index * self.columns // across for index in range(across)]
+        rows = [index * self.rows // down for index in range(down)]
+        return numpy.add.reduceat(numpy.add.reduceat(fruit, cols, axis=0), rows, axis=1)
+
+    def ice_extents(self, direction):
+        """[col, row] array of how many ice blocks in a row start one cell away in direction.
+
+        That is the line destroy_ice would break facing that way from each cell.
+        """
+        # Turn the board so the direction runs forward along axis 0
+        vertical, backward = direction in ("up", "down"), direction in ("left", "up")
+        ice = (self.cells & self.ICE) != 0
+        if vertical:
+            ice = ice.T
+        if backward:
+            ice = ice[::-1]
+        # The ice run starting at each index is its distance to the last cell without ice, counting from the far end
+        count = ice.shape[0]
+        index = numpy.arange(1, count + 1)[:, None]
+        gaps = numpy.maximum.accumulate(numpy.where(ice[::-1], 0, index), axis=0)
+        runs = (index - gaps)[::-1]
+        extents = numpy.zeros_like(runs)
+        extents[:-1] = runs[1:]
+        if backward:
+            extents = extents[::-1]
+        return extents.T if vertical else extents
+
+    @property
+    def size(self):
+        return (self.columns, self.rows)
+
+    def background(self):
+        """Return (surface, rect) of the floor, walls and iglu, in board coordinates."""
+        if self.rect.size == (SCREEN_WIDTH, SCREEN_HEIGHT):
+            return screen_cache.get("background")
+        if self.size not in self.backgrounds:
+            self.backgrounds[self.size] = (self.build_background(), self.rect.copy())
+        return self.backgrounds[self.size]
+
+    # In background.png: thickness of each wall with its shadow (left, top, right, bottom), and a piece of bare floor
+    wall_art = (52, 50, 52, 52)
+    floor_art = (52, 50, 238, 520)
+
+    def build_background(self):
+        """Stretches the window's background: its corners, its walls and floor tiled, its iglu in the middle."""
+        image = screen_cache.get("background")[0]
+        art = image.get_rect()
+        left, top, right, bottom = self.wall_art
+        surface = pygame.Surface(self.rect.size).convert()
+        self.tile(surface, image.subsurface(self.floor_art), self.rect)
+        walls = [
+            ((left, 0, art.width - left - right, top), (left, 0, self.rect.width - left - right, top)),
+            ((left, art.height - bottom, art.width - left - right, bottom),
+             (left, self.rect.height - bottom, self.rect.width - left - right, bottom)),
+            ((0, top, left, art.height - top - bottom), (0, top, left, self.rect.height - top - bottom)),
+            ((art.width - right, top, right, art.height - top - bottom),
+             (self.rect.width - right, top, right, self.rect.height - top - bottom)),
+        ]
+        for piece, area in walls:
+            self.tile(surface, image.subsurface(piece), pygame.Rect(area))
+        corners = [("topleft", left, top), ("topright", right, top), ("bottomleft", left, bottom), ("bottomright", right, bottom)]
+        for corner, width, height in corners:
+            piece = pygame.Rect(0, 0, width, height)
+            setattr(piece, corner, getattr(art, corner))
+            area = piece.copy()
+            setattr(area, corner, getattr(self.rect, corner))
+            surface.blit(image, area, piece)
+        iglu = iglu_inv_rect.inflate(40, 30)  # the drawing is a bit wider than the obstacle
+        surface.blit(image, iglu.move(self.iglu.x - iglu_inv_rect.x, self.iglu.y - iglu_inv_rect.y), iglu)
+        return surface
+
+    @staticmethod
+    def tile(surface, piece, area):
+        surface.set_clip(area)
+        for x in range(area.left, area.right, piece.get_width()):
+            for y in range(area.top, area.bottom, piece.get_height()):
+                surface.blit(piece, (x, y))
+        surface.set_clip(None)
+
+board = Board((SCREEN_WIDTH - 2 * WALL_SIZE) // ICE_WIDTH, (SCREEN_HEIGHT - 2 * WALL_SIZE) // ICE_HEIGHT)
+
+def on_lattice(pos):
+    return (pos[0] - WALL_SIZE) % ICE_WIDTH == 0 and (pos[1] - WALL_SIZE) % ICE_HEIGHT == 0
+
+def walkable(cell, iceblocks):
+    """True if cell is on the board, not under the iglu and free of ice."""
+    return (0 <= cell[0] < board.columns and 0 <= cell[1] < board.rows
+            and cell not in board.iglu_cells and cell not in iceblocks.cells)
+
+
+class TrollGroup(pygame.sprite.Group):
+    """Sprite group of trolls with a table of the cells each one holds.
+
+    A troll holds the cell it stands on and, while walking, the one it is walking into.
+    """
+    def __init__(self, *sprites, board=None):
+        self.holders = {}  # cell -> troll
+        self.held = {}  # troll -> cells
+        self.board = board  # the Board whose TROLL bits this group keeps, None for a scratch group
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        self.claim(IceGrid.cell(*sprite.rect.topleft), sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.release(sprite)
+
+    def free(self, cell, troll):
+        return self.holders.get(cell, troll) is troll
+
+    def colliding(self, rect):
+        """Return the trolls overlapping rect. Only the holders of rect's cells can."""
+        found = []
+        for cell in IceGrid.cells_for(rect):
+            troll = self.holders.get(cell)
+            if troll is not None and troll not in found and rect.colliderect(troll.rect):
+                found.append(troll)
+        return found
+
+    def claim(self, cell, troll):
+        self.holders[cell] = troll
+        self.held.setdefault(troll, set()).add(cell)
+        if self.board is not None:
+            self.board.mark(cell, Board.TROLL, True)
+
+    def release(self, troll, keep=None):
+        """Frees every cell troll holds, except keep."""
+        for cell in self.held.pop(troll, ()):
+            if self.holders.get(cell) is troll:
+                del self.holders[cell]
+                if self.board is not None:
+                    self.board.mark(cell, Board.TROLL, False)
+        if keep is not None:
+            self.claim(keep, troll)
+
+
+class FlowField:
+    """Breadth-first distances, in cells, from the player to every cell of the board.
+
+    Ice and the iglu block the way; it is rebuilt when the player changes cell or the ice changes.
+    """
+    def __init__(self, players, iceblocks):
+        self.players = players
+        self.iceblocks = iceblocks
+        self.key = None
+        self.distances = {}
+        self.builds = 0
+
+    def update(self):
+        """Rebuilds the field if the player changed cell or the ice changed."""
+        if not self.players:
+            return
+        start = IceGrid.cell(*self.players.sprites()[0].rect.center)
+        key = (start, self.iceblocks.version)
+        if key == self.key:
+            return
+        self.key = key
+        self.builds += 1
+        distances = {start: 0}
+        frontier = [start]
+        while frontier:
+            following = []
+            for col, row in frontier:
+                for cell in ((col, row - 1), (col, row + 1), (col - 1, row), (col + 1, row)):
+                    if cell not in distances and walkable(cell, self.iceblocks):
+                        distances[cell] = distances[(col, row)] + 1
+                        following.append(cell)
+            frontier = following
+        self.distances = distances
+
+    def closest(self, choices):
+        """Of a {direction: topleft} dict, return the directions leading nearest the player.
+
+        All of them if none can reach the player.
+        """
+        steps = {direction: self.distances.get(IceGrid.cell(*pos)) for direction, pos in choices.items()}
+        reachable = [step for step in steps.values() if step is not None]
+        if not reachable:
+            return list(choices)
+        return [direction for direction, step in steps.items() if step == min(reachable)]
+
 
 class Player(pygame.sprite.Sprite):
     def __init__(self,x,y,ice_group,trolls,fruits):
         super().__init__()
-        self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/frente/part1.png"))
-        self.image.set_colorkey((49, 202, 49))
+        self.quebrando = animation_frames.get("choco", "quebrando")
+        self.cuspindo_direita_lista = animation_frames.get("choco", "cuspindo", "dir")
+        self.cuspindo_esquerda_lista = animation_frames.get("choco", "cuspindo", "esq")
+        self.cuspindo_frente_lista = animation_frames.get("choco", "cuspindo", "fre")
+        self.cuspindo_tras_lista = animation_frames.get("choco", "cuspindo", "tra")
+        self.morrendo_lista = animation_frames.get("choco", "morrendo")
+        self.andando_frente_lista = animation_frames.get("choco", "andando", "fre")
+        self.andando_tras_lista = animation_frames.get("choco", "andando", "tra")
+        self.andando_esq_lista = animation_frames.get("choco", "andando", "esq")
+        self.andando_dir_lista = animation_frames.get("choco", "andando", "dir")
+        self.comendo_frente_lista = animation_frames.get("choco", "comendo", "fre")
+        self.comendo_tras_lista = animation_frames.get("choco", "comendo", "tra")
+        self.comendo_esq_lista = animation_frames.get("choco", "comendo", "esq")
+        self.comendo_dir_lista = animation_frames.get("choco", "comendo", "dir")
+        self.vencendo_lista = animation_frames.get("choco", "vencendo")
+        self.image = self.andando_frente_lista[0]
         self.rect = self.image.get_rect(topleft=(x,y))
-        self.quebrando = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_quebrando_gelo/part{i}.png")) for i in range(1,9)]
-        self.cuspindo_direita_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_gelo/da direita/part{i}.png")) for i in range(1,9)]
-        self.cuspindo_esquerda_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_gelo/da esquerda/part{i}.png")) for i in range(1,9)]
-        self.cuspindo_frente_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_gelo/de frente/part{i}.png")) for i in range(1,13)]
-        self.cuspindo_tras_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_gelo/de tras/part{i}.png")) for i in range(1,13)]
-        self.morrendo_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_morte/part{i}.png")) for i in range(1,16)]
-        self.andando_frente_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_andando/frente/part{i}.png")) for i in range(1,9)]
-        self.andando_tras_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_andando/tras/part{i}.png")) for i in range(1,9)]
-        self.andando_esq_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_andando/esquerda/part{i}.png")) for i in range(1,9)]
-        self.andando_dir_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_andando/direita/part{i}.png")) for i in range(1,9)]
-        self.comendo_frente_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_comendo/frente/part{i}.png")) for i in range(1,8)]
-        self.comendo_tras_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_comendo/tras/part{i}.png")) for i in range(1,8)]
-        self.comendo_esq_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_comendo/esquerda/part{i}.png")) for i in range(1,8)]
-        self.comendo_dir_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_comendo/direita/part{i}.png")) for i in range(1,8)]
-        self.vencendo_lista = [pygame.transform.scale2x(pygame.image.load(f"Resources/choco/choco_vencendo/part{i}.png")) for i in range(1,7)]
         self.comendo_index = 0
         self.quebrando_index = 0
         self.cuspindo_index = 0
@@ -248,6 +926,8 @@ class Player(pygame.sprite.Sprite):
         self.fruta_comida = None
         self.pontos = 0
         self.winning_timer = 0
+        self.controls = None  # PressedKeys set by Simulation.step; None reads the keyboard
+        self.sound = True
 
     def animation_comendo(self):
         if self.fre:
@@ -259,12 +939,13 @@ class Player(pygame.sprite.Sprite):
         elif self.dir:
             self.image = self.comendo_dir_lista[int(self.comendo_index)]
         self.comendo_index += 0.7
-        self.image.set_colorkey((49, 202, 49))
         if self.comendo_index >= 7:
             self.comendo_index = 0
             self.comendo = False
-            self.fruits.remove(self.fruta_comida)
+            Fruits.release(self.fruta_comida)
             self.pontos += 50
+            if self.sound:
+                audio.play("eat")
 
     def animation_andando(self):
         if self.fre:
@@ -276,14 +957,12 @@ class Player(pygame.sprite.Sprite):
         elif self.dir:
             self.image = self.andando_dir_lista[int(self.andando_index)]
         self.andando_index += 0.15
-        self.image.set_colorkey((49, 202, 49))
         if self.andando_index >= 8:
             self.andando_index = 0
 
     def animation_morrendo(self):
         self.image = self.morrendo_lista[int(self.morrendo_index)]
         self.morrendo_index += 0.10
-        self.image.set_colorkey((49, 202, 49))
         if self.morrendo_index >= 15:
             self.morrendo_index = 0
             self.morrendo = False
@@ -292,7 +971,6 @@ class Player(pygame.sprite.Sprite):
     def animation_vencendo(self):
         self.image = self.vencendo_lista[int(self.vencendo_index)]
         self.vencendo_index += 0.15
-        self.image.set_colorkey((49, 202, 49))
         if self.vencendo_index >= 6:
             self.vencendo_index = 0
             self.winning = False
@@ -305,14 +983,13 @@ class Player(pygame.sprite.Sprite):
             self.destroying = False
             self.destroy_ice()
             if self.fre:
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/frente/part1.png"))
+                self.image = self.andando_frente_lista[0]
             elif self.tra:
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/tras/part1.png"))
+                self.image = self.andando_tras_lista[0]
             elif self.dir:
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/direita/part1.png"))
+                self.image = self.andando_dir_lista[0]
             elif self.esq:
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/esquerda/part1.png"))
-        self.image.set_colorkey((49, 202, 49))
+                self.image = self.andando_esq_lista[0]
 
     def animation_cuspindo_gelo(self):
         if self.fre:
@@ -322,7 +999,7 @@ class Player(pygame.sprite.Sprite):
                 self.cuspindo_index = 0
                 self.cuspindo = False
                 self.place_ice()
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/frente/part1.png"))
+                self.image = self.andando_frente_lista[0]
         elif self.tra:
             self.image = self.cuspindo_tras_lista[int(self.cuspindo_index)]
             self.cuspindo_index += 0.25
@@ -330,7 +1007,7 @@ class Player(pygame.sprite.Sprite):
                 self.cuspindo_index = 0
                 self.cuspindo = False
                 self.place_ice()
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/tras/part1.png"))
+                self.image = self.andando_tras_lista[0]
         elif self.dir:
             self.image = self.cuspindo_direita_lista[int(self.cuspindo_index)]
             self.cuspindo_index += 0.25
@@ -338,7 +1015,7 @@ class Player(pygame.sprite.Sprite):
                 self.cuspindo_index = 0
                 self.cuspindo = False
                 self.place_ice()
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/direita/part1.png"))
+                self.image = self.andando_dir_lista[0]
         elif self.esq:
             self.image = self.cuspindo_esquerda_lista[int(self.cuspindo_index)]
             self.cuspindo_index += 0.25
@@ -346,8 +1023,7 @@ class Player(pygame.sprite.Sprite):
                 self.cuspindo_index = 0
                 self.cuspindo = False
                 self.place_ice()
-                self.image = pygame.transform.scale2x(pygame.image.load("Resources/choco/choco_andando/esquerda/part1.png"))
-        self.image.set_colorkey((49, 202, 49))
+                self.image = self.andando_esq_lista[0]
 
     def place_ice(self):
         """Places ice continually in the direction of the player until it reaches an obstacle"""
@@ -367,22 +1043,26 @@ class Player(pygame.sprite.Sprite):
             y -= ICE_HEIGHT
             direction = "up"
 
-        while WALL_SIZE <= x <= SCREEN_WIDTH - WALL_SIZE - ICE_WIDTH and WALL_SIZE <= y <= SCREEN_HEIGHT - WALL_SIZE - ICE_HEIGHT:
-            new_ice = IceBlocks(x, y)
+        placed = False
+        while WALL_SIZE <= x <= board.rect.width - WALL_SIZE - ICE_WIDTH and WALL_SIZE <= y <= board.rect.height - WALL_SIZE - ICE_HEIGHT:
+            new_rect = pygame.Rect(x, y, ICE_WIDTH, ICE_HEIGHT)
 
             # Stop placing ice if it collides with iglu or player
-            if new_ice.rect.colliderect(iglu_inv_rect) or new_ice.rect.colliderect(self.rect):
+            if new_rect.colliderect(board.iglu) or new_rect.colliderect(self.rect):
                 return
 
             # Stop if it collides with other ice blocks
-            if any(new_ice.rect.colliderect(iceblock.rect) for iceblock in self.ice_group):
+            if self.ice_group.collides(new_rect):
                 return
 
             # Stop if it collides with trolls
-            if any(new_ice.rect.colliderect(troll) for troll in self.trolls):
+            if self.trolls.colliding(new_rect):
                 return
 
-            self.ice_group.add(new_ice)
+            self.ice_group.add(IceBlocks(x, y))
+            if self.sound and not placed:
+                audio.play("spray")
+            placed = True
 
             # Move to the next ice position
             if direction == "left":
@@ -407,10 +1087,8 @@ class Player(pygame.sprite.Sprite):
         ice_nearby = {}
 
         for direction, position in directions.items():
-            for iceblock in self.ice_group:
-                if iceblock.rect.topleft == position:
-                    ice_nearby[direction] = True
-                    break  # No need to check further for this direction
+            if self.ice_group.at(position) is not None:
+                ice_nearby[direction] = True
 
         return ice_nearby
     
@@ -427,11 +1105,7 @@ class Player(pygame.sprite.Sprite):
         ]
         
         # Check if any ice block exists at one of these positions
-        for iceblock in self.ice_group:
-            if (iceblock.rect.topleft in adjacent_positions):
-                return True  # Ice block found nearby
-
-        return False
+        return any(self.ice_group.at(position) is not None for position in adjacent_positions)
     
     def destroy_ice(self):
         "Destroys ice continually"
@@ -441,65 +1115,27 @@ class Player(pygame.sprite.Sprite):
             to_remove = []  
 
             if self.fre and directions.get("fre"):
-                yatual = self.rect.y
-                while True:
-                    found = False
-                    for iceblock in self.ice_group:
-                        if iceblock.rect.x == self.rect.x and iceblock.rect.y == yatual + ICE_HEIGHT:
-                            to_remove.append(iceblock)
-                            found = True
-                            break
-                    if not found:
-                        break
-                    yatual += ICE_HEIGHT
+                to_remove += self.ice_group.walk(self.rect.topleft, (0, ICE_HEIGHT))
 
             if self.tra and directions.get("tra"):
-                yatual = self.rect.y
-                while True:
-                    found = False
-                    for iceblock in self.ice_group:
-                        if iceblock.rect.x == self.rect.x and iceblock.rect.y == yatual - ICE_HEIGHT:
-                            to_remove.append(iceblock)
-                            found = True
-                            break
-                    if not found:
-                        break
-                    yatual -= ICE_HEIGHT
+                to_remove += self.ice_group.walk(self.rect.topleft, (0, -ICE_HEIGHT))
 
             if self.esq and directions.get("esq"):
-                xatual = self.rect.x
-                while True:
-                    found = False
-                    for iceblock in self.ice_group:
-                        if iceblock.rect.y == self.rect.y and iceblock.rect.x == xatual - ICE_WIDTH:
-                            to_remove.append(iceblock)
-                            found = True
-                            break
-                    if not found:
-                        break
-                    xatual -= ICE_WIDTH
+                to_remove += self.ice_group.walk(self.rect.topleft, (-ICE_WIDTH, 0))
 
             if self.dir and directions.get("dir"):
-                xatual = self.rect.x
-                while True:
-                    found = False
-                    for iceblock in self.ice_group:
-                        if iceblock.rect.y == self.rect.y and iceblock.rect.x == xatual + ICE_WIDTH:
-                            to_remove.append(iceblock)
-                            found = True
-                            break
-                    if not found:
-                        break
-                    xatual += ICE_WIDTH
+                to_remove += self.ice_group.walk(self.rect.topleft, (ICE_WIDTH, 0))
 
             for iceblock in to_remove:
-                self.ice_group.remove(iceblock)
+                IceBlocks.release(iceblock)
+            if to_remove and self.sound:
+                audio.play("break")
 
         except KeyError:
             pass
 
     def update(self):
-        keys = pygame.key.get_pressed()
+        keys = pygame.key.get_pressed() if self.controls is None else self.controls
         speed = 5
         
         # Ice creation
@@ -534,27 +1170,28 @@ class Player(pygame.sprite.Sprite):
                     self.andando = False
 
         # Keep player inside the walls
-        self.rect.x = max(WALL_SIZE, min(self.rect.x, SCREEN_WIDTH - WALL_SIZE - self.rect.width))
-        self.rect.y = max(WALL_SIZE, min(self.rect.y, SCREEN_HEIGHT - WALL_SIZE - self.rect.height))
+        self.rect.x = max(WALL_SIZE, min(self.rect.x, board.rect.width - WALL_SIZE - self.rect.width))
+        self.rect.y = max(WALL_SIZE, min(self.rect.y, board.rect.height - WALL_SIZE - self.rect.height))
 
         # Prevent player from colliding with iglu
-        if self.rect.colliderect(iglu_inv_rect):
+        if self.rect.colliderect(board.iglu):
             self.rect.bottomleft = self.last_pos
 
         # Prevent player from walking into ice
-        for iceblock in self.ice_group:
-            if self.rect.colliderect(iceblock):
-                self.rect.bottomleft = self.last_pos
+        if self.ice_group.collides(self.rect):
+            self.rect.bottomleft = self.last_pos
 
         #Player dies if he touches enemies
-        if any(self.rect.colliderect(troll) for troll in self.trolls):
+        if self.trolls.colliding(self.rect):
+            if self.sound and not self.morrendo:
+                audio.stinger("lose")
             self.morrendo = True
 
         # Fruit disappears if player comes in contact with the fruit
-        for fruit in self.fruits:
-            if self.rect.colliderect(fruit):
-                self.comendo = True
-                self.fruta_comida = fruit
+        touching = self.fruits.colliding(self.rect)
+        if touching:
+            self.comendo = True
+            self.fruta_comida = touching[-1]
 
         if self.destroying:
             self.animation_quebrando()
@@ -563,9 +1200,6 @@ class Player(pygame.sprite.Sprite):
             self.animation_cuspindo_gelo()
 
         if self.morrendo:
-            pygame.mixer.music.stop()
-            losing_music.play()
-            pygame.mixer.music.play()
             self.animation_morrendo()
 
         if self.andando:
@@ -575,9 +1209,6 @@ class Player(pygame.sprite.Sprite):
             self.animation_comendo()
 
         if self.winning:
-            pygame.mixer.music.stop()
-            winnning_music.play()
-            pygame.mixer.music.play()
             self.andando = False
             self.animation_vencendo()
 
@@ -586,822 +1217,1276 @@ class Player(pygame.sprite.Sprite):
 
 # Music themes
 music = True
-current_music = "placeholder"
-winnning_music = pygame.mixer.Sound("Resources/music/WinMusic.mp3")
-losing_music = pygame.mixer.Sound("Resources/music/LoseMusic.mp3")
 
-# Switching songs through screens
-def play_music_for_screen(active_screen):
-    global current_music
+class Audio:
+    """Music and sound effects, played only when something changes.
+
+    Each effect has a reserved channel, so playing it again restarts it instead of stacking copies.
+    """
+    files = {
+        "win": "Resources/music/WinMusic.mp3",
+        "lose": "Resources/music/LoseMusic.mp3",
+        "eat": "Resources/sounds/eat.wav",
+        "spray": "Resources/sounds/spray.wav",
+        "break": "Resources/sounds/break.wav",
+    }
     music_files = {
         "start": "Resources/music/MenuMusic.mp3",
-        "levels": "Resources/music/MenuMusic.mp3", 
-        "paused": "Resources/music/MenuMusic.mp3", 
-        "help": "Resources/music/MenuMusic.mp3", 
+        "levels": "Resources/music/MenuMusic.mp3",
+        "paused": "Resources/music/MenuMusic.mp3",
+        "help": "Resources/music/MenuMusic.mp3",
         "credits": "Resources/music/MenuMusic.mp3",
         "gaming": "Resources/music/GameMusic.mp3",
     }
 
-    if current_music != music_files[active_screen]:
-        pygame.mixer.music.load(music_files[active_screen])
-        pygame.mixer.music.play(-1)  # Loop indefinitely
-        current_music = music_files[active_screen]
+    def __init__(self):
+        self.sounds = {}
+        self.channels = {}
+        self.track = None
+        self.calls = 0  # mixer calls since the last end_frame()
+        self.noisy_frames = 0  # frames that made any
+        pygame.mixer.set_num_channels(max(8, len(self.files) + 4))
+        pygame.mixer.set_reserved(len(self.files))
+
+    def get(self, name):
+        if name not in self.sounds:
+            self.sounds[name] = assets.take(self.files[name], "sound")
+            self.channels[name] = pygame.mixer.Channel(list(self.files).index(name))
+        return self.sounds[name]
+
+    def play(self, name):
+        """Starts an effect on its channel, cutting it short if it was already playing."""
+        sound = self.get(name)
+        self.channels[name].play(sound)
+        self.calls += 1
+
+    def stinger(self, name):
+        """Stops the music for the win or lose theme. It comes back with the next screen's track."""
+        pygame.mixer.music.stop()
+        self.play(name)
+        self.calls += 1
+
+    def music_for(self, screen):
+        track = self.music_files[screen]
+        if track != self.track:
+            pygame.mixer.music.load(track)
+            pygame.mixer.music.play(-1)  # Loop indefinitely
+            self.track = track
+            self.calls += 2
+
+    def stop_music(self):
+        pygame.mixer.music.stop()
+        self.calls += 1
+
+    def resume_music(self):
+        pygame.mixer.music.play(-1)
+        self.calls += 1
+
+    def end_frame(self):
+        if self.calls:
+            self.noisy_frames += 1
+        self.calls = 0
+
+audio = Audio()
+
+# Score HUD
+class ScoreHUD:
+    """Score display that builds its glyphs once and only re-renders when the score changes."""
+    digit_names = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+    colorkey = (131, 206, 82)
+
+    def __init__(self, topleft=(60, 0)):
+        self.topleft = topleft
+        self.digits = None
+        self.pontos = None
+        self.renders = 0
+
+    def load(self):
+        """Builds the glyphs and the cached surface; done on the first draw."""
+        files = self.files()
+        self.label = assets.take(*files[0]).convert()
+        self.label.set_colorkey(self.colorkey)
+        self.digits = []
+        for path, how in files[1:]:
+            img = assets.take(path, how).convert()
+            img.set_colorkey(self.colorkey)
+            self.digits.append(img)
+        self.label_pos = (0, 2)
+        self.digit_pos = [(50 + index * 25, 20) for index in range(6)]
+        width = max(self.label.get_width(), self.digit_pos[-1][0] + max(d.get_width() for d in self.digits))
+        height = max(2 + self.label.get_height(), 20 + max(d.get_height() for d in self.digits))
+        self.surface = pygame.Surface((width, height)).convert()
+        self.surface.set_colorkey(self.colorkey)
+
+    def files(self):
+        """The label, then the digits 0 to 9, as assets."""
+        return [("Resources/score/player1.png", 2)] + [(f"Resources/score/{name}.png", 2.5) for name in self.digit_names]
+
+    def render(self, pontos):
+        """Redraws the cached surface for a new score."""
+        self.surface.fill(self.colorkey)
+        self.surface.blit(self.label, self.label_pos)
+        for pos, digit in zip(self.digit_pos, str(pontos).zfill(6)):
+            self.surface.blit(self.digits[int(digit)], pos)
+        self.pontos = pontos
+        self.renders += 1
+
+    def update(self, pontos):
+        if self.digits is None:
+            self.load()
+        if pontos != self.pontos:
+            self.render(pontos)
+
+    def draw(self, surface, pontos):
+        self.update(pontos)
+        surface.blit(self.surface, self.topleft)
+
+score_hud = ScoreHUD()
+
+# Menu, pause, help, credits and levels interfaces
+class ScreenCache:
+    """Keeps every full-screen interface loaded once, in display format."""
+    interfaces = {
+        "start": "Resources/menu/start.png",
+        "levels": "Resources/levels_interface/levels.png",
+        "help": "Resources/help/background.png",
+        "credits": "Resources/credits/background.png",
+        "paused": "Resources/minimenu/Paused.webp",
+        "background": "Resources/background.png",
+    }
+
+    def __init__(self, max_idle=None):
+        self.max_idle = max_idle  # ms without being shown before a screen is dropped (None keeps everything)
+        self.surfaces = {}
+        self.last_shown = {}
+        self.loads = 0
+
+    def get(self, name):
+        """Return (surface, rect) for a screen, loading it on first use."""
+        if name not in self.surfaces:
+            image = assets.take(self.interfaces[name]).convert()
+            self.surfaces[name] = (image, image.get_rect(center = (SCREEN_WIDTH//2,SCREEN_HEIGHT//2)))
+            self.loads += 1
+        self.last_shown[name] = pygame.time.get_ticks()
+        return self.surfaces[name]
+
+    def evict_idle(self):
+        """Drops screens that have not been shown for more than max_idle ms."""
+        if self.max_idle is None:
+            return
+        now = pygame.time.get_ticks()
+        for name in list(self.surfaces):
+            if now - self.last_shown[name] > self.max_idle:
+                del self.surfaces[name]
+
+screen_cache = ScreenCache(max_idle=120000)
 
 # Sprite groups
-iceblocks = pygame.sprite.Group()
-trolls = pygame.sprite.Group()
-fruits = pygame.sprite.Group()
+iceblocks = IceGrid(board=board)
+trolls = TrollGroup(board=board)
+fruits = FruitGrid(board=board)
 players = pygame.sprite.Group()
 all_sprites = pygame.sprite.Group(players,trolls) 
+ice_transparency = IceTransparency(fruits, iceblocks)
+
+# Camera: the part of the board shown in the window
+class Camera:
+    """Window-sized view of the board, following the player on boards bigger than the window.
+
+    A smaller board is centered. view is what is shown plus a cell around it, None until the screen is drawn.
+    """
+    def __init__(self, size, board, margin=(ICE_WIDTH, ICE_HEIGHT)):
+        self.rect = pygame.Rect((0, 0), size)
+        self.board = board
+        self.margin = margin
+        self.view = None
+
+    def follow(self, target):
+        self.rect.center = target.center
+        self.rect.clamp_ip(self.board.rect)
+        self.view = self.rect.inflate(2 * self.margin[0], 2 * self.margin[1])
+
+    def sees(self, rect):
+        return self.view is None or self.view.colliderect(rect)
+
+camera = Camera((SCREEN_WIDTH, SCREEN_HEIGHT), board)
+
+# Gaming screen renderer
+class BoardRenderer:
+    """Draws the gaming screen, pushing only what changed since the last frame.
+
+    Background and ice are cached in a layer; each frame only redraws the rects of sprites that changed.
+    """
+    def __init__(self, surface, fruits, sprites, iceblocks, camera, report=False):
+        self.surface = surface
+        self.fruits = fruits
+        self.sprites = sprites
+        self.iceblocks = iceblocks
+        self.camera = camera
+        self.offset = (0, 0)  # camera topleft, subtracted from board coordinates
+        self.layer = pygame.Surface(surface.get_size()).convert()
+        self.layer_key = None  # (ice version, fruits version, camera topleft) the layer was built for
+        self.winning = False
+        self.drawn = {}  # sprite or overlay -> (image, rect, version) as last drawn
+        self.full = True
+        self.report = report  # print the share of the window pushed per frame, once a second
+        self.pushed = 0  # pixels handed to display.update since the last report
+        self.frames = 0
+
+    def shifted(self, rect):
+        return rect.move(-self.offset[0], -self.offset[1])
+
+    def extent(self, sprite):
+        # Some animation frames are bigger than the sprite's rect, which only sets the topleft
+        return pygame.Rect(sprite.rect.x - self.offset[0], sprite.rect.y - self.offset[1], *sprite.image.get_size())
+
+    def invalidate(self):
+        """Makes the next draw a full one, e.g. after another screen was shown."""
+        self.full = True
+
+    def rebuild_layer(self, background, background_rect):
+        shown = self.shifted(background_rect)
+        if not shown.contains(self.layer.get_rect()):
+            self.layer.fill((0, 0, 0))
+        self.layer.blit(background, shown)
+        for iceblock in self.iceblocks.colliding(self.camera.rect):
+            self.layer.blit(iceblock.image, self.shifted(iceblock.rect))
+
+    def stacks(self, winning):
+        # Ice is drawn over the characters, except while the winning animation plays
+        view = self.camera.rect.inflate(2 * ICE_WIDTH, 2 * ICE_HEIGHT)
+        if view.contains(self.camera.board.rect):
+            fruits, sprites = self.fruits.sprites(), self.sprites.sprites()
+        else:
+            fruits = self.fruits.colliding(view)
+            sprites = [sprite for sprite in self.sprites if view.colliderect(sprite.rect)]
+        if winning:
+            return [fruits, self.iceblocks, sprites]
+        return [fruits, sprites, self.iceblocks]
+
+    def compose(self, area, stacks, background, background_rect, overlays=()):
+        """Draws area, in window coordinates, from scratch, clipped to it."""
+        surface = self.surface
+        surface.set_clip(area)
+        board_area = area.move(self.offset)
+        if self.iceblocks.collides(board_area):
+            shown = self.shifted(background_rect)
+            if not shown.contains(area):
+                surface.fill((0, 0, 0), area)
+            surface.blit(background, shown)
+            groups = stacks
+        else:
+            surface.blit(self.layer, area, area)
+            groups = [group for group in stacks if group is not self.iceblocks]
+        for group in groups:
+            if group is self.iceblocks:
+                for iceblock in self.iceblocks.colliding(board_area):
+                    surface.blit(iceblock.image, self.shifted(iceblock.rect))
+            else:
+                for sprite in group:
+                    if area.colliderect(self.extent(sprite)):
+                        surface.blit(sprite.image, self.shifted(sprite.rect))
+        for image, rect, version in overlays:
+            if area.colliderect(rect):
+                surface.blit(image, rect)
+        surface.set_clip(None)
+
+    def draw(self, background, background_rect, winning, overlays):
+        """Draws a frame and returns the rects to pass to display.update, or None for the whole window.
+
+        overlays are (image, rect, version) in window coordinates; bump version when an image is redrawn in place.
+        """
+        self.offset = self.camera.rect.topleft
+        layer_key = (self.iceblocks.version, self.fruits.version, self.offset)
+        stacks = self.stacks(winning)
+        moving = [sprite for group in stacks if group is not self.iceblocks for sprite in group]
+        if self.full or layer_key != self.layer_key or winning != self.winning:
+            if self.full or layer_key != self.layer_key:
+                self.rebuild_layer(background, background_rect)
+            self.layer_key = layer_key
+            self.winning = winning
+            self.full = False
+            self.surface.blit(self.layer, (0, 0))
+            for group in stacks:
+                if group is not self.iceblocks:
+                    for sprite in group:
+                        self.surface.blit(sprite.image, self.shifted(sprite.rect))
+            for sprite in moving:
+                if self.iceblocks.collides(self.extent(sprite).move(self.offset)):
+                    self.compose(self.extent(sprite), stacks, background, background_rect)
+            for image, rect, version in overlays:
+                self.surface.blit(image, rect)
+            self.drawn = {sprite: (sprite.image, self.extent(sprite), 0) for sprite in moving}
+            self.drawn.update((rect.topleft, (image, rect, version)) for image, rect, version in overlays)
+            dirty = None
+        else:
+            dirty = []
+            drawn = {}
+            for sprite in moving:
+                state = (sprite.image, self.extent(sprite), 0)
+                drawn[sprite] = state
+                last = self.drawn.pop(sprite, None)
+                if last is None:
+                    dirty.append(state[1])
+                elif last[0] is not state[0] or last[1] != state[1]:
+                    dirty.append(last[1].union(state[1]))
+            for image, rect, version in overlays:
+                state = (image, rect, version)
+                drawn[rect.topleft] = state
+                last = self.drawn.pop(rect.topleft, None)
+                if last is None or last[0] is not image or last[1] != rect or last[2] != version:
+                    dirty.append(rect if last is None else last[1].union(rect))
+            for image, rect, version in self.drawn.values():
+                dirty.append(rect)
+            self.drawn = drawn
+            for area in dirty:
+                self.compose(area, stacks, background, background_rect, overlays)
+
+        if self.report:
+            window = self.surface.get_rect()
+            if dirty is None:
+                self.pushed += window.width * window.height
+            else:
+                self.pushed += sum(area.clip(window).width * area.clip(window).height for area in dirty)
+            self.frames += 1
+            if self.frames == 60:
+                share = self.pushed / self.frames / (window.width * window.height)
+                print(f"dirty rects: {share:.1%} of the window pushed per frame")
+                self.pushed = 0
+                self.frames = 0
+        return dirty
+
+board_renderer = BoardRenderer(screen, fruits, all_sprites, iceblocks, camera, report=False)
+
+# Niveis e rounds: um arquivo de texto por nível em Resources/levels (formato no README)
+LEVEL_DIR = "Resources/levels"
+FRUIT_DROP = 7  # how far below the middle of its cell a "v" fruit sits
+
+class Round:
+    """Where everything starts in one round, in pixels. Sprites are only made from it when the round begins.
+
+    Rounds are templates shared by every session, so load_level hands them out as tuples.
+    """
+    def __init__(self, fruit):
+        self.fruit = fruit
+        self.fruits = []  # centers
+        self.trolls = []  # toprights, as Troll expects
+        self.ice = []  # toplefts
+        self.players = []  # toplefts
+        self.size = None  # (columns, rows) of the board grid, on the first round
+
+def load_level(path):
+    """Parses a level file into a list of Rounds.
+
+    The "board" grid needs exactly one P, and every "fruit <kind>" grid after it must fit in it.
+    """
+    board = Round(None)
+    rounds = []
+    grid = None
+    row = 0
+    columns = rows = 0
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            line = line.rstrip()
+            if not line or line.startswith(";"):
+                continue
+            if line == "board":
+                grid, row = board, 0
+                continue
+            if line.startswith("fruit "):
+                grid, row = Round(line[len("fruit "):]), 0
+                rounds.append(grid)
+                continue
+            if grid is None:
+                raise ValueError(f"{path}:{number}: grid row before any board/fruit header")
+            y = WALL_SIZE + row * ICE_HEIGHT
+            for col, char in enumerate(line):
+                x = WALL_SIZE + col * ICE_WIDTH
+                if char == ".":
+                    continue
+                elif grid is board and char == "#":
+                    board.ice.append((x, y))
+                elif grid is board and char == "T":
+                    board.trolls.append((x + ICE_WIDTH, y))
+                elif grid is board and char == "P":
+                    board.players.append((x, y))
+                elif grid is not board and char in "ov":
+                    drop = FRUIT_DROP if char == "v" else 0
+                    grid.fruits.append((x + ICE_WIDTH // 2, y + ICE_HEIGHT // 2 + drop))
+                else:
+                    raise ValueError(f"{path}:{number}: unexpected {char!r} in {'board' if grid is board else 'fruit'} grid")
+            row += 1
+            if grid is board:
+                columns, rows = max(columns, len(line)), row
+            elif len(line) > columns or row > rows:
+                raise ValueError(f"{path}:{number}: fruit grid bigger than the {columns}x{rows} board")
+    if not rounds:
+        raise ValueError(f"{path}: no fruit grid")
+    if len(board.players) != 1:
+        raise ValueError(f"{path}: the board grid needs exactly one P, found {len(board.players)}")
+    rounds[0].trolls, rounds[0].ice, rounds[0].players = board.trolls, board.ice, board.players
+    rounds[0].size = (columns, rows)
+    for round in rounds:
+        round.fruits, round.trolls = tuple(round.fruits), tuple(round.trolls)
+        round.ice, round.players = tuple(round.ice), tuple(round.players)
+    return tuple(rounds)
+
+class Levels:
+    """Level files by index, levels[0] being lv1.txt. Each file is parsed the first time it is played."""
+    def __init__(self, directory=LEVEL_DIR):
+        self.directory = directory
+        self.rounds = {}
+
+    def path(self, index):
+        return os.path.join(self.directory, f"lv{index + 1}.txt")
+
+    def __getitem__(self, index):
+        if index not in self.rounds:
+            if index < 0 or not os.path.exists(self.path(index)):
+                raise IndexError(f"no level file {self.path(index)}")
+            self.rounds[index] = load_level(self.path(index))
+        return self.rounds[index]
+
+    def __len__(self):
+        count = 0
+        while os.path.exists(self.path(count)):
+            count += 1
+        return count
+
+levels = Levels()
+
+def level_assets(index):
+    """The assets a level draws, as AssetLoader pairs: its fruits, the ice, the trolls, the player and the board."""
+    kinds = sorted({round.fruit for round in levels[index]})
+    items = [(Fruits.path.format(kind), None) for kind in kinds] + [(IceBlocks.path, "scale2x")]
+    for key in sorted(FrameCache.animations, key=lambda key: key[0] != "troll"):
+        items += animation_frames.files(key)
+    return items + [(ScreenCache.interfaces["background"], None)]
 
-# Niveis e rounds
-lv1_round1 = [
-        [Troll(130,224,iceblocks,trolls),
-        Troll(730,224,iceblocks,trolls)],
-
-        [Fruits(110,y,"grapes",fruits,iceblocks) for y in range(144,550,58)] + 
-        [Fruits(5*40 + 20 + 50,3*58 + 29 + 50,"grapes",fruits,iceblocks),Fruits(5*40 + 20 + 50,5*58 + 29 + 50,"grapes",fruits,iceblocks), Fruits(12*40 + 20 + 50,3*58 + 29 + 50,"grapes",fruits,iceblocks),Fruits(12*40 + 20 + 50,5*58 + 29 + 50,"grapes",fruits,iceblocks)] +
-        [Fruits(110+15*40,y,"grapes",fruits,iceblocks) for y in range(144,550,58)],
-
-        [IceBlocks(50,y) for y in range(50,622-58,58)] + [IceBlocks(730,y) for y in range(50,622-58,58)] + 
-        [IceBlocks(x,50) for x in range(50+40,820-50-40,40)] + [IceBlocks(x,622-50-58) for x in range(50+40,820-50-40,40)] + 
-        [IceBlocks(50+4*40,y) for y in range(50+58*2,50+58*7,58)] + [IceBlocks(50+13*40,y) for y in range(50+58*2,50+58*7,58)] + 
-        [IceBlocks(50+5*40,50+58*2),IceBlocks(50+12*40,50+58*2),IceBlocks(50+5*40,50+58*6),IceBlocks(50+12*40,50+58*6)],
-
-        [Player(450,SCREEN_HEIGHT-50 -58*2,iceblocks,trolls,fruits)],
-        ]
-
-lv1_round2 = [
-        [troll for troll in trolls],
-
-        [Fruits(110,y,"peach",fruits,iceblocks) for y in range(144,144+58*2,58)] + 
-        [Fruits(110,y,"peach",fruits,iceblocks) for y in range(550-58,550-58*3,-58)] + 
-        [Fruits(110+15*40,y,"peach",fruits,iceblocks) for y in range(144,144+58*2,58)] + 
-        [Fruits(110+15*40,y,"peach",fruits,iceblocks) for y in range(550-58,550-58*3,-58)] + 
-        [Fruits(110+40,144,"peach",fruits,iceblocks),Fruits(110+40,550-58,"peach",fruits,iceblocks),Fruits(110+14*40,144,"peach",fruits,iceblocks),Fruits(110+14*40,550-58,"peach",fruits,iceblocks)] +
-        [Fruits(5*40 + 20 + 50,3*58 + 29 + 50,"peach",fruits,iceblocks),Fruits(5*40 + 20 + 50,5*58 + 29 + 50,"peach",fruits,iceblocks), Fruits(12*40 + 20 + 50,3*58 + 29 + 50,"peach",fruits,iceblocks),Fruits(12*40 + 20 + 50,5*58 + 29 + 50,"peach",fruits,iceblocks)],
-
-        [iceblock for iceblock in iceblocks],
-
-        [player for player in players],
-        ]
-
-lv1_round3 = [
-        [troll for troll in trolls],
-
-        [Fruits(x,144,"pear",fruits,iceblocks) for x in range(110,820-50-40,40)] + 
-        [Fruits(x,550-58,"pear",fruits,iceblocks) for x in range(110,820-50-40,40)] + 
-        [Fruits(110,y,"pear",fruits,iceblocks) for y in range(144+58,550-58,58)] +
-        [Fruits(110+15*40,y,"pear",fruits,iceblocks) for y in range(144+58,550-58,58)] +
-        [Fruits(4*40 + 20 + 50,y,"pear",fruits,iceblocks) for y in range(2*58 + 29 + 50,7*58 + 29 + 50,58)] +
-        [Fruits(13*40 + 20 + 50,y,"pear",fruits,iceblocks) for y in range(2*58 + 29 + 50,7*58 + 29 + 50,58)] +
-        [Fruits(5*40 + 20 + 50,2*58 + 29 + 50,"pear",fruits,iceblocks),Fruits(5*40 + 20 + 50,6*58 + 29 + 50,"pear",fruits,iceblocks), Fruits(12*40 + 20 + 50,2*58 + 29 + 50,"pear",fruits,iceblocks),Fruits(12*40 + 20 + 50,6*58 + 29 + 50,"pear",fruits,iceblocks)],
-
-        [iceblock for iceblock in iceblocks],
-
-        [player for player in players],
-        ]
-
-lv2_round1 = [
-        [Troll(250,224,iceblocks,trolls),
-        Troll(610,224,iceblocks,trolls),
-        Troll(130,282,iceblocks,trolls),
-        Troll(450,SCREEN_HEIGHT-50 -58*2,iceblocks,trolls),
-        Troll(730,398,iceblocks,trolls)],
-
-        [Fruits(110,y,"strawberry",fruits,iceblocks) for y in range(144,550,58)] + 
-        [Fruits(4*40 + 20 + 50,1*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(4*40 + 20 + 50,5*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(5*40 + 20 + 50,7*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(9*40 + 20 + 50,7*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(6*40 + 20 + 50,5*58 + 29 + 50,"strawberry",fruits,iceblocks), Fruits(13*40 + 20 + 50,58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(13*40 + 20 + 50,4*58 + 29 + 50,"strawberry",fruits,iceblocks)] +
-        [Fruits(110+15*40,y,"strawberry",fruits,iceblocks) for y in range(282+29,492,58)],
-
-        [IceBlocks(50,y) for y in range(50,622-58,58)] + [IceBlocks(730,y) for y in range(50,622-58,58)] + 
-        [IceBlocks(x,50) for x in range(50+40,820-50-40,40)] + [IceBlocks(x,622-50-58) for x in range(50+40,820-50-40,40)] + 
-        [IceBlocks(50+4*40,y) for y in range(50+58*6,50+58*8,58)] + [IceBlocks(50+11*40,y) for y in range(50+58*1,50+58*8,58)] +
-        [IceBlocks(50+5*40,y) for y in range(50+58*1,50+58*7,58)] + [IceBlocks(50+13*40,y) for y in range(50+58*5,50+58*8,58)] +
-        [IceBlocks(50+3*40,y) for y in range(50+58*1,50+58*8,58)] + [IceBlocks(50+14*40,y) for y in range(50+58*1,50+58*8,58)] +
-        [IceBlocks(50+2*40,y) for y in range(50+58*1,50+58*8,58)] + [IceBlocks(50+12*40,y) for y in range(50+58*1,50+58*8,58)] +
-        [IceBlocks(50+6*40,y) for y in range(50+58*1,50+58*5,58)] + [IceBlocks(x,SCREEN_HEIGHT-50 -58*3) for x in range(50+40*6,50+40*11,40)] +
-        [IceBlocks(50+10*40,50+58*7)] +
-        [IceBlocks(x,50+2*58) for x in range(50+40*7,50+40*11,40)] + [IceBlocks(50+15*40,y) for y in range(50+58*1,50+58*8,58)] +
-        [IceBlocks(50+16*40,y) for y in range(50+58*1,50+58*4,58)],
-
-        [Player(370,50 + 58,iceblocks,trolls,fruits)],
-        ]
-
-lv2_round2 = [
-        [troll for troll in trolls],
-
-        [Fruits(50 + col * 40 +20, 50 + row * 58 + 29, "orange", fruits, iceblocks)
-        for col in range(0,18) for row in range(0,4,2)] +
-        [Fruits(50 + col * 40 +20, 622 - 50 - row * 58 - 29, "orange", fruits, iceblocks)
-        for col in range(0,18) for row in range(0,4,2)] +
-
-        [Fruits(50 + col * 40 +20, 224 + row * 58 + 29, "orange", fruits, iceblocks)
-        for col in range(0,7) for row in range(0,4,2)] +
-        [Fruits(50 + col * 40 +20, 224 + row * 58 + 29, "orange", fruits, iceblocks)
-        for col in range(11,18) for row in range(0,4,2)],
-        
-
-        [Iceblock for Iceblock in iceblocks],
-
-        [player for player in players],
-        ]
-
-lv2_round3 = [
-        [troll for troll in trolls],
-
-        [Fruits(50 + x * 40 + 20, 50 + 2 * 58 + 29,"pepper",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + x * 40 + 20, 50 + 6 * 58 + 29,"pepper",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + 6 * 40 + 20, 50 + 3 * 58 + 29,"pepper",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 4 * 58 + 29,"pepper",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 5 * 58 + 29,"pepper",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 3 * 58 + 29,"pepper",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 4 * 58 + 29,"pepper",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 5 * 58 + 29,"pepper",fruits,iceblocks)],
-
-        [Iceblock for Iceblock in iceblocks],
-
-        [player for player in players],
-        ]
-
-lv3_round1 = [
-        [Troll(330,50+58,iceblocks,trolls),
-        Troll(410,50+58,iceblocks,trolls),
-        Troll(530,50+58,iceblocks,trolls),
-        Troll(410,50+58*7,iceblocks,trolls),
-        Troll(530,50+58*7,iceblocks,trolls),
-        Troll(330,50+58*7,iceblocks,trolls)],
-
-        [Fruits(70,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*1,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*2,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*3,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*4,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*5,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*6,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] +
-        [Fruits(70 + 40*11,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*12,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*13,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*14,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*15,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*16,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*17,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)],
-
-        [IceBlocks(50,y) for y in range(50,622-58,58*2)] + [IceBlocks(90,y) for y in range(50+58,622-58*2,58*2)] + 
-        [IceBlocks(130,y) for y in range(50,622-58,58*2)] + [IceBlocks(170,y) for y in range(50+58,622-58*2,58*2)] + 
-        [IceBlocks(210,y) for y in range(50,622-58,58*2)] + [IceBlocks(250,y) for y in range(50+58,622-58*2,58*2)] + 
-        [IceBlocks(290,y) for y in range(50,622-58,58*2)] + [IceBlocks(290+5*40,y) for y in range(50,622-58,58*2)] + 
-        [IceBlocks(290+6*40,y) for y in range(50+58,622-58*2,58*2)] + [IceBlocks(290+7*40,y) for y in range(50,622-58,58*2)] + 
-        [IceBlocks(290+8*40,y) for y in range(50+58,622-58*2,58*2)] + [IceBlocks(290+9*40,y) for y in range(50,622-58,58*2)] + 
-        [IceBlocks(290+10*40,y) for y in range(50+58,622-58*2,58*2)] + [IceBlocks(290+11*40,y) for y in range(50,622-58,58*2)] +
-        [IceBlocks(x,50) for x in range(330,290+5*40,40)] + [IceBlocks(330,50+58),IceBlocks(450,50+58)] + [IceBlocks(x,50+58*2) for x in range(330,290+5*40,40)] +
-        [IceBlocks(x,50+58*6) for x in range(330,290+5*40,40)] + [IceBlocks(330,50+58*7),IceBlocks(450,50+58*7)] + [IceBlocks(x,50+58*8) for x in range(330,290+5*40,40)],
-
-        [Player(730,SCREEN_HEIGHT-50 -58*2,iceblocks,trolls,fruits)],
-        ]
-
-lv3_round2 = [
-        [troll for troll in trolls],
-
-        [Fruits(50 + x * 40 + 20, 50 + 2 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + x * 40 + 20, 50 + 6 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + 6 * 40 + 20, 50 + 3 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 4 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 5 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 3 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 4 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 5 * 58 + 29,"kiwi",fruits,iceblocks)] +
-        [Fruits(50 + x * 40 + 20, 50 + 1 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + x * 40 + 20, 50 + 7 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + 5 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + 12 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + x * 40 + 20, 50 + 29,"kiwi",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + x * 40 + 20, 50 + 8 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + 2 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,8)] +
-        [Fruits(50 + 15 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,8)],
-        
-        [Iceblock for Iceblock in iceblocks],
-
-        [player for player in players],
-        ]
-
-lv3_round3 = [
-        [troll for troll in trolls],
-
-        [Fruits(50 + x * 40 + 20, 50 + 2 * 58 + 29,"green apple",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + x * 40 + 20, 50 + 6 * 58 + 29,"green apple",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + 6 * 40 + 20, 50 + 3 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 4 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 5 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 3 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 4 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 5 * 58 + 29,"green apple",fruits,iceblocks)] +
-        [Fruits(50 + x * 40 + 20, 50 + 1 * 58 + 29,"green apple",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + x * 40 + 20, 50 + 7 * 58 + 29,"green apple",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + 5 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + 12 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + x * 40 + 20, 50 + 29,"green apple",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + x * 40 + 20, 50 + 8 * 58 + 29,"green apple",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + 2 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,8)] +
-        [Fruits(50 + 15 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,8)],
-        
-        [Iceblock for Iceblock in iceblocks],
+lv_final = 3
+WIN_TICKS = 300  # ticks the winning animation plays before the level ends (5 s at 60 fps)
+
+# Actions a bot can pass to Simulation.step, mapped to the keys Player.update reads
+ACTIONS = {
+    "right": pygame.K_d,
+    "left": pygame.K_a,
+    "up": pygame.K_w,
+    "down": pygame.K_s,
+    "ice": pygame.K_f,
+    "break": pygame.K_SPACE,
+}
+ACTION_BITS = {action: 1 << i for i, action in enumerate(ACTIONS)}
+KEYBOARD = {
+    "right": (pygame.K_d, pygame.K_RIGHT),
+    "left": (pygame.K_a, pygame.K_LEFT),
+    "up": (pygame.K_w, pygame.K_UP),
+    "down": (pygame.K_s, pygame.K_DOWN),
+    "ice": (pygame.K_f,),
+    "break": (pygame.K_SPACE,),
+}
+
+def keyboard_actions():
+    """Return the actions currently held down on the keyboard."""
+    keys = pygame.key.get_pressed()
+    return [action for action, codes in KEYBOARD.items() if any(keys[code] for code in codes)]
+
+def actions_mask(actions):
+    mask = 0
+    for action in actions:
+        mask |= ACTION_BITS[action]
+    return mask
+
+def mask_actions(mask):
+    return [action for action, bit in ACTION_BITS.items() if mask & bit]
+
+class PressedKeys:
+    """Stands in for pygame.key.get_pressed() with a fixed set of actions held down."""
+    def __init__(self, actions):
+        self.keys = {ACTIONS[action] for action in actions}
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+# Replays
+save_replays = False  # keep a recording of every session in REPLAY_DIR
+REPLAY_DIR = "replays"
+CHECKPOINT_TICKS = 60
+
+class Recording:
+    """Seed and per-tick inputs of one session, enough to replay it exactly.
+
+    Inputs are run-length encoded; a CRC chain of the states is kept every CHECKPOINT_TICKS ticks.
+    """
+    def __init__(self, level, round, seed, inputs=None, checkpoints=None, chase=False):
+        self.level = level
+        self.round = round
+        self.seed = seed
+        self.chase = chase
+        self.inputs = inputs or []
+        self.checkpoints = checkpoints or {}
+        self.last = None  # (tick, chain) of the latest tick, saved as a final checkpoint
+
+    @property
+    def ticks(self):
+        return sum(count for count, mask in self.inputs)
+
+    def add(self, mask):
+        if self.inputs and self.inputs[-1][1] == mask:
+            self.inputs[-1][0] += 1
+        else:
+            self.inputs.append([1, mask])
+
+    def masks(self):
+        for count, mask in self.inputs:
+            for _ in range(count):
+                yield mask
+
+    def save(self, path):
+        checkpoints = dict(self.checkpoints)
+        if self.last is not None:
+            checkpoints[self.last[0]] = self.last[1]
+        data = {
+            "level": self.level,
+            "round": self.round,
+            "seed": self.seed,
+            "chase": self.chase,
+            "inputs": self.inputs,
+            "checkpoints": sorted(checkpoints.items()),
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            data = json.load(file)
+        return cls(data["level"], data["round"], data["seed"], data["inputs"],
+                   {tick: crc for tick, crc in data["checkpoints"]}, data.get("chase", False))
+
+
+class Simulation:
+    """Game logic of the gaming screen, without drawing or frame limiting.
+
+    Every session started by reset() has its own seeded Random and is recorded.
+    """
+    def __init__(self, sound=True, chase=False):
+        self.sound = sound
+        self.chase = chase
+        self.flow = FlowField(players, iceblocks)
+        self.level = 1
+        self.round = 1
+        self.tick = 0
+        self.winning_counter = 0
+        self.rng = random.Random()
+        self.seed = None
+        self.chain = 0
+        self.recording = None
+
+    def reset(self, level, round=1, seed=None):
+        """Starts a session on a level, skipping ahead to round. A random seed is picked if none is given."""
+        self.finish()
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.tick = 0
+        self.chain = 0
+        self.recording = Recording(level, round, seed, chase=self.chase)
+        self.build(level, round)
+        return self.state()
+
+    def finish(self):
+        """Ends the current session, saving its recording if save_replays is on."""
+        if save_replays and self.recording is not None and self.recording.inputs:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            self.recording.save(os.path.join(REPLAY_DIR, f"lv{self.recording.level}-{self.recording.seed}.json"))
+        self.recording = None
+
+    def build(self, level, round=1):
+        """Rebuilds a level from its first round and skips ahead to round."""
+        self.level = level
+        first = levels[level-1][0]
+
+        self.round = 1
+        self.winning_counter = 0
+        for fruit in fruits.sprites():
+            Fruits.release(fruit)
+        for iceblock in iceblocks.sprites():
+            IceBlocks.release(iceblock)
+        all_sprites.empty()
+        fruits.empty()
+        players.empty()
+        iceblocks.empty()
+        trolls.empty()
+        if board.size != first.size:
+            board.resize(*first.size)
+
+        for x, y in first.trolls:
+            self.add_troll(x, y)
+        self.add_fruits(first)
+        for x, y in first.ice:
+            iceblocks.add(IceBlocks(x, y))
+        for x, y in first.players:
+            player = Player(x, y, iceblocks, trolls, fruits)
+            players.add(player)
+            all_sprites.add(player)
+            board.place_player(player.rect)
+
+        while self.round < round:
+            self.next_round()
+
+    def next_round(self):
+        """Swaps in the fruits of the next round, keeping trolls, ice and player."""
+        self.round += 1
+        for fruit in fruits.sprites():
+            Fruits.release(fruit)
+        self.add_fruits(levels[self.level-1][self.round-1])
+
+    def add_troll(self, x, y):
+        troll = Troll(x, y, iceblocks, trolls)
+        troll.rng = self.rng
+        troll.flow = self.flow if self.chase else None
+        trolls.add(troll)
+        all_sprites.add(troll)
+        return troll
+
+    def add_fruits(self, round):
+        for x, y in round.fruits:
+            fruits.add(Fruits(x, y, round.fruit, fruits, iceblocks))
+
+    def move_on_grid(self):
+        """Grid-moving system for player and trolls."""
+        for player in all_sprites:
+            if player.counter > 0 and not player.duvido and not player.winning:
+                player.andando = True
+            else:
+                player.andando = False
+            if not player.cuspindo and not player.destroying and not player.winning:
+                if player.tra:
+                    if player.counter > 0:
+                        player.counter -= 1
+                        player.rect.y -= player.speed
+                        if player.counter == 1:
+                            player.rect.y -= player.speed_end
+                elif player.fre:
+                    if player.counter > 0:
+                        player.counter -= 1
+                        player.rect.y += player.speed
+                        if player.counter == 1:
+                            player.rect.y += player.speed_end
+                elif player.dir:
+                    if player.counter > 0:
+                        player.counter -= 1
+                        player.rect.x += player.speed
+                elif player.esq:
+                    if player.counter > 0:
+                        player.counter -= 1
+                        player.rect.x -= player.speed
 
-        [player for player in players],
-        ]
+    def step(self, actions=None):
+        """Advances one tick. actions is an iterable of ACTIONS names, or None for the keyboard."""
+        if actions is None:
+            actions = keyboard_actions()
+        self.tick += 1
+        if self.recording is not None:
+            self.recording.add(actions_mask(actions))
+        controls = PressedKeys(actions)
+        for player in players:
+            player.controls = controls
+            player.sound = self.sound
 
-# Simple way to get unaltered lists for any round of any level
-def get_round(level, round):
-
-    l1_r1 = [
-            [Troll(130,224,iceblocks,trolls),
-            Troll(730,224,iceblocks,trolls)],
-
-            [Fruits(110,y,"grapes",fruits,iceblocks) for y in range(144,550,58)] + 
-            [Fruits(5*40 + 20 + 50,3*58 + 29 + 50,"grapes",fruits,iceblocks),Fruits(5*40 + 20 + 50,5*58 + 29 + 50,"grapes",fruits,iceblocks), Fruits(12*40 + 20 + 50,3*58 + 29 + 50,"grapes",fruits,iceblocks),Fruits(12*40 + 20 + 50,5*58 + 29 + 50,"grapes",fruits,iceblocks)] +
-            [Fruits(110+15*40,y,"grapes",fruits,iceblocks) for y in range(144,550,58)],
-            [IceBlocks(50,y) for y in range(50,622-58,58)] + [IceBlocks(730,y) for y in range(50,622-58,58)] + 
-            [IceBlocks(x,50) for x in range(50+40,820-50-40,40)] + [IceBlocks(x,622-50-58) for x in range(50+40,820-50-40,40)] + 
-            [IceBlocks(50+4*40,y) for y in range(50+58*2,50+58*7,58)] + [IceBlocks(50+13*40,y) for y in range(50+58*2,50+58*7,58)] + 
-            [IceBlocks(50+5*40,50+58*2),IceBlocks(50+12*40,50+58*2),IceBlocks(50+5*40,50+58*6),IceBlocks(50+12*40,50+58*6)],
-
-            [Player(450,SCREEN_HEIGHT-50 -58*2,iceblocks,trolls,fruits)],
-            ]
-
-    l1_r2 = [
-            [troll for troll in trolls],
-
-            [Fruits(110,y,"peach",fruits,iceblocks) for y in range(144,144+58*2,58)] + 
-            [Fruits(110,y,"peach",fruits,iceblocks) for y in range(550-58,550-58*3,-58)] + 
-            [Fruits(110+15*40,y,"peach",fruits,iceblocks) for y in range(144,144+58*2,58)] + 
-            [Fruits(110+15*40,y,"peach",fruits,iceblocks) for y in range(550-58,550-58*3,-58)] + 
-            [Fruits(110+40,144,"peach",fruits,iceblocks),Fruits(110+40,550-58,"peach",fruits,iceblocks),Fruits(110+14*40,144,"peach",fruits,iceblocks),Fruits(110+14*40,550-58,"peach",fruits,iceblocks)] +
-            [Fruits(5*40 + 20 + 50,3*58 + 29 + 50,"peach",fruits,iceblocks),Fruits(5*40 + 20 + 50,5*58 + 29 + 50,"peach",fruits,iceblocks), Fruits(12*40 + 20 + 50,3*58 + 29 + 50,"peach",fruits,iceblocks),Fruits(12*40 + 20 + 50,5*58 + 29 + 50,"peach",fruits,iceblocks)],
-
-            [iceblock for iceblock in iceblocks],
-
-            [player for player in players],
-            ]
-
-    l1_r3 = [
-            [troll for troll in trolls],
-
-            [Fruits(x,144,"pear",fruits,iceblocks) for x in range(110,820-50-40,40)] + 
-            [Fruits(x,550-58,"pear",fruits,iceblocks) for x in range(110,820-50-40,40)] + 
-            [Fruits(110,y,"pear",fruits,iceblocks) for y in range(144+58,550-58,58)] +
-            [Fruits(110+15*40,y,"pear",fruits,iceblocks) for y in range(144+58,550-58,58)] +
-            [Fruits(4*40 + 20 + 50,y,"pear",fruits,iceblocks) for y in range(2*58 + 29 + 50,7*58 + 29 + 50,58)] +
-            [Fruits(13*40 + 20 + 50,y,"pear",fruits,iceblocks) for y in range(2*58 + 29 + 50,7*58 + 29 + 50,58)] +
-            [Fruits(5*40 + 20 + 50,2*58 + 29 + 50,"pear",fruits,iceblocks),Fruits(5*40 + 20 + 50,6*58 + 29 + 50,"pear",fruits,iceblocks), Fruits(12*40 + 20 + 50,2*58 + 29 + 50,"pear",fruits,iceblocks),Fruits(12*40 + 20 + 50,6*58 + 29 + 50,"pear",fruits,iceblocks)],
-
-            [iceblock for iceblock in iceblocks],
-
-            [player for player in players],
-            ]
-
-    l2_r1 = [
-            [Troll(250,224,iceblocks,trolls),
-            Troll(610,224,iceblocks,trolls),
-            Troll(130,282,iceblocks,trolls),
-            Troll(450,SCREEN_HEIGHT-50 -58*2,iceblocks,trolls),
-            Troll(730,398,iceblocks,trolls)],
-
-            [Fruits(110,y,"strawberry",fruits,iceblocks) for y in range(144,550,58)] + 
-            [Fruits(4*40 + 20 + 50,1*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(4*40 + 20 + 50,5*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(5*40 + 20 + 50,7*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(9*40 + 20 + 50,7*58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(6*40 + 20 + 50,5*58 + 29 + 50,"strawberry",fruits,iceblocks), Fruits(13*40 + 20 + 50,58 + 29 + 50,"strawberry",fruits,iceblocks),Fruits(13*40 + 20 + 50,4*58 + 29 + 50,"strawberry",fruits,iceblocks)] +
-            [Fruits(110+15*40,y,"strawberry",fruits,iceblocks) for y in range(282+29,492,58)],
-
-            [IceBlocks(50,y) for y in range(50,622-58,58)] + [IceBlocks(730,y) for y in range(50,622-58,58)] + 
-            [IceBlocks(x,50) for x in range(50+40,820-50-40,40)] + [IceBlocks(x,622-50-58) for x in range(50+40,820-50-40,40)] + 
-            [IceBlocks(50+4*40,y) for y in range(50+58*6,50+58*8,58)] + [IceBlocks(50+11*40,y) for y in range(50+58*1,50+58*8,58)] +
-            [IceBlocks(50+5*40,y) for y in range(50+58*1,50+58*7,58)] + [IceBlocks(50+13*40,y) for y in range(50+58*5,50+58*8,58)] +
-            [IceBlocks(50+3*40,y) for y in range(50+58*1,50+58*8,58)] + [IceBlocks(50+14*40,y) for y in range(50+58*1,50+58*8,58)] +
-            [IceBlocks(50+2*40,y) for y in range(50+58*1,50+58*8,58)] + [IceBlocks(50+12*40,y) for y in range(50+58*1,50+58*8,58)] +
-            [IceBlocks(50+6*40,y) for y in range(50+58*1,50+58*5,58)] + [IceBlocks(x,SCREEN_HEIGHT-50 -58*3) for x in range(50+40*6,50+40*11,40)] +
-            [IceBlocks(50+10*40,50+58*7)] +
-            [IceBlocks(x,50+2*58) for x in range(50+40*7,50+40*11,40)] + [IceBlocks(50+15*40,y) for y in range(50+58*1,50+58*8,58)] +
-            [IceBlocks(50+16*40,y) for y in range(50+58*1,50+58*4,58)],
-            [Player(370,50 + 58,iceblocks,trolls,fruits)],
-            ]
-
-    l2_r2 = [
-            [troll for troll in trolls],
-
-            [Fruits(50 + col * 40 +20, 50 + row * 58 + 29, "orange", fruits, iceblocks)
-            for col in range(0,18) for row in range(0,4,2)] +
-            [Fruits(50 + col * 40 +20, 622 - 50 - row * 58 - 29, "orange", fruits, iceblocks)
-            for col in range(0,18) for row in range(0,4,2)] +
-
-            [Fruits(50 + col * 40 +20, 224 + row * 58 + 29, "orange", fruits, iceblocks)
-            for col in range(0,7) for row in range(0,4,2)] +
-            [Fruits(50 + col * 40 +20, 224 + row * 58 + 29, "orange", fruits, iceblocks)
-            for col in range(11,18) for row in range(0,4,2)],
-            
-
-            [Iceblock for Iceblock in iceblocks],
-            [player for player in players],
-            ]
-
-    l2_r3 = [
-            [troll for troll in trolls],
-
-            [Fruits(50 + x * 40 + 20, 50 + 2 * 58 + 29,"pepper",fruits,iceblocks) for x in range(7, 11)] +
-            [Fruits(50 + x * 40 + 20, 50 + 6 * 58 + 29,"pepper",fruits,iceblocks) for x in range(7, 11)] +
-            [Fruits(50 + 6 * 40 + 20, 50 + 3 * 58 + 29,"pepper",fruits,iceblocks),
-            Fruits(50 + 6 * 40 + 20, 50 + 4 * 58 + 29,"pepper",fruits,iceblocks),
-            Fruits(50 + 6 * 40 + 20, 50 + 5 * 58 + 29,"pepper",fruits,iceblocks),
-            Fruits(50 + 11 * 40 + 20, 50 + 3 * 58 + 29,"pepper",fruits,iceblocks),
-            Fruits(50 + 11 * 40 + 20, 50 + 4 * 58 + 29,"pepper",fruits,iceblocks),
-            Fruits(50 + 11 * 40 + 20, 50 + 5 * 58 + 29,"pepper",fruits,iceblocks)],
-
-            [Iceblock for Iceblock in iceblocks],
-            [player for player in players],
-            ]
-
-    l3_r1 = [
-        [Troll(330,50+58,iceblocks,trolls),
-        Troll(410,50+58,iceblocks,trolls),
-        Troll(530,50+58,iceblocks,trolls),
-        Troll(410,50+58*7,iceblocks,trolls),
-        Troll(530,50+58*7,iceblocks,trolls),
-        Troll(330,50+58*7,iceblocks,trolls)],
-
-        [Fruits(70,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*1,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*2,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*3,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*4,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*5,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*6,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] +
-        [Fruits(70 + 40*11,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*12,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*13,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*14,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*15,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)] + 
-        [Fruits(70 + 40*16,y,"lemon",fruits,iceblocks) for y in range(144-58,550+58,58*2)] + 
-        [Fruits(70 + 40*17,y,"lemon",fruits,iceblocks) for y in range(144,550,58*2)],
-
-        [IceBlocks(50,y) for y in range(50,622-58,58*2)] + [IceBlocks(90,y) for y in range(50+58,622-58*2,58*2)] + 
-        [IceBlocks(130,y) for y in range(50,622-58,58*2)] + [IceBlocks(170,y) for y in range(50+58,622-58*2,58*2)] + 
-        [IceBlocks(210,y) for y in range(50,622-58,58*2)] + [IceBlocks(250,y) for y in range(50+58,622-58*2,58*2)] + 
-        [IceBlocks(290,y) for y in range(50,622-58,58*2)] + [IceBlocks(290+5*40,y) for y in range(50,622-58,58*2)] + 
-        [IceBlocks(290+6*40,y) for y in range(50+58,622-58*2,58*2)] + [IceBlocks(290+7*40,y) for y in range(50,622-58,58*2)] + 
-        [IceBlocks(290+8*40,y) for y in range(50+58,622-58*2,58*2)] + [IceBlocks(290+9*40,y) for y in range(50,622-58,58*2)] + 
-        [IceBlocks(290+10*40,y) for y in range(50+58,622-58*2,58*2)] + [IceBlocks(290+11*40,y) for y in range(50,622-58,58*2)] +
-        [IceBlocks(x,50) for x in range(330,290+5*40,40)] + [IceBlocks(330,50+58),IceBlocks(450,50+58)] + [IceBlocks(x,50+58*2) for x in range(330,290+5*40,40)] +
-        [IceBlocks(x,50+58*6) for x in range(330,290+5*40,40)] + [IceBlocks(330,50+58*7),IceBlocks(450,50+58*7)] + [IceBlocks(x,50+58*8) for x in range(330,290+5*40,40)],
-
-        [Player(730,SCREEN_HEIGHT-50 -58*2,iceblocks,trolls,fruits)],
-        ]
+        frame_timer.mark("events")
 
-    l3_r2 = [
-        [troll for troll in trolls],
-
-        [Fruits(50 + x * 40 + 20, 50 + 2 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + x * 40 + 20, 50 + 6 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + 6 * 40 + 20, 50 + 3 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 4 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 5 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 3 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 4 * 58 + 29,"kiwi",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 5 * 58 + 29,"kiwi",fruits,iceblocks)] +
-
-        [Fruits(50 + x * 40 + 20, 50 + 1 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + x * 40 + 20, 50 + 7 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + 5 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + 12 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,6)] +
-        
-        [Fruits(50 + x * 40 + 20, 50 + 29,"kiwi",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + x * 40 + 20, 50 + 8 * 58 + 29,"kiwi",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + 2 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,8)] +
-        [Fruits(50 + 15 * 40 + 20, 50 + y * 58 + 29,"kiwi",fruits,iceblocks) for y in range(2,8)],
+        # Update sprites
+        if self.chase:
+            self.flow.update()
+        frame_timer.mark("sprites")
+        fruits.update()
+        frame_timer.mark("fruits")
+        all_sprites.update()
+        frame_timer.mark("sprites")
+        self.move_on_grid()
+        for player in players:
+            board.place_player(player.rect)
+        frame_timer.mark("grid")
 
-        [Iceblock for Iceblock in iceblocks],
+        result = None
 
-        [player for player in players],
-        ]
+        # Montando layout do proximo round
+        for player in players:
+            if player.done:
+                self.winning_counter = 0
+                player.done = False
+                self.next_round()
 
-    l3_r3 = [
-        [troll for troll in trolls],
-
-        [Fruits(50 + x * 40 + 20, 50 + 2 * 58 + 29,"green apple",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + x * 40 + 20, 50 + 6 * 58 + 29,"green apple",fruits,iceblocks) for x in range(7, 11)] +
-        [Fruits(50 + 6 * 40 + 20, 50 + 3 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 4 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 6 * 40 + 20, 50 + 5 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 3 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 4 * 58 + 29,"green apple",fruits,iceblocks),
-        Fruits(50 + 11 * 40 + 20, 50 + 5 * 58 + 29,"green apple",fruits,iceblocks)] +
-        [Fruits(50 + x * 40 + 20, 50 + 1 * 58 + 29,"green apple",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + x * 40 + 20, 50 + 7 * 58 + 29,"green apple",fruits,iceblocks) for x in range(5, 13)] +
-        [Fruits(50 + 5 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + 12 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,6)] +
-        [Fruits(50 + x * 40 + 20, 50 + 29,"green apple",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + x * 40 + 20, 50 + 8 * 58 + 29,"green apple",fruits,iceblocks) for x in range(3, 15)] +
-        [Fruits(50 + 2 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,8)] +
-        [Fruits(50 + 15 * 40 + 20, 50 + y * 58 + 29,"green apple",fruits,iceblocks) for y in range(2,8)],
-        
-        [Iceblock for Iceblock in iceblocks],
+        # Check Winning Condition
+        for player in players:
+            if len(fruits) == 0:
+                if self.round == len(levels[self.level-1]):
+                    player.winning = True
+                    if self.winning_counter == 0:
+                        player.winning_timer = self.tick
+                        self.winning_counter = 1
+                        if self.sound:
+                            audio.stinger("win")
+                    if self.tick - player.winning_timer >= WIN_TICKS:
+                        player.winning = False
+                        self.build(self.level)
+                        result = "won"
+                else:
+                    player.done = True
 
-        [player for player in players],
-        ]
-    
-    if level == 1 == round:
-        return l1_r1
-    elif level == 1 and round == 2:
-        return l1_r2
-    elif level == 1 and round == 3:
-        return l1_r3
-    elif level == 2 and round == 1:
-        return l2_r1
-    elif level == 2 and round == 2:
-        return l2_r2
-    elif level == 2 and round == 3:
-        return l2_r3
-    elif level == 3 and round == 1:
-        return l3_r1
-    elif level == 3 and round == 2:
-        return l3_r2
-    elif level == 3 and round == 3:
-        return l3_r3
-
-# Dicionários para níveis
-lv1_rounds = {1:lv1_round1, 2:lv1_round2, 3:lv1_round3}
-
-lv2_rounds = {1: lv2_round1, 2: lv2_round2, 3: lv2_round3}
-
-lv3_rounds = {1: lv3_round1, 2: lv3_round2, 3: lv3_round3}
-
-lvs = [lv1_rounds,lv2_rounds,lv3_rounds]
-
-round_final = 3
-lv_final = 3
-round_atual = 1
-lv_atual = 1
+        # Check if player lost the level
+        for player in players:
+            if player.morto:
+                self.build(self.level)
+                result = "lost"
+
+        self.chain = zlib.crc32(self.state_key(), self.chain)
+        if self.recording is not None:
+            self.recording.last = (self.tick, self.chain)
+            if self.tick % CHECKPOINT_TICKS == 0:
+                self.recording.checkpoints[self.tick] = self.chain
+        state = self.state(result)
+        frame_timer.mark("rules")
+        return state
+
+    def state_key(self):
+        """Bytes identifying the board state, hashed every tick for replays."""
+        player = players.sprites()[0]
+        key = (self.level, self.round, player.rect.topleft, player.pontos, player.morrendo, player.winning,
+               [troll.rect.topleft for troll in trolls], len(fruits), len(iceblocks))
+        return repr(key).encode()
+
+    def replay(self, recording):
+        """Re-runs a recording and returns the first checkpoint tick that does not match, or None."""
+        chase, self.chase = self.chase, recording.chase
+        try:
+            self.reset(recording.level, recording.round, recording.seed)
+            self.recording = None
+            checkpoints = recording.checkpoints
+            for mask in recording.masks():
+                self.step(mask_actions(mask))
+                if self.tick in checkpoints and checkpoints[self.tick] != self.chain:
+                    return self.tick
+            return None
+        finally:
+            self.chase = chase
+
+    def state(self, result=None):
+        player = players.sprites()[0]
+        return {
+            "tick": self.tick,
+            "level": self.level,
+            "round": self.round,
+            "player": player.rect.topleft,
+            "score": player.pontos,
+            "dying": player.morrendo,
+            "winning": player.winning,
+            "trolls": [troll.rect.topleft for troll in trolls],
+            "fruits": len(fruits),
+            "ice": len(iceblocks),
+            "board": board.cells.copy(),
+            "result": result,
+        }
 
-counter = 0
+troll_chase = False  # trolls chase the player along a FlowField instead of wandering
+simulation = Simulation(chase=troll_chase)
 
 # Restart do Nível
 def restart():
-    global round_atual, players, trolls, iceblocks, all_sprites, fruits
-
-    round = get_round(lv_atual,1)
-
-    round_atual = 1
-    all_sprites.empty()
-    fruits.empty()
-    players.empty()
-    iceblocks.empty()
-    trolls.empty()
-
-    for i in lvs[lv_atual-1]:
-        lvs[lv_atual-1][i] = get_round(lv_atual,i)
-
-    for k, i in enumerate(round):
-        if k == 0:
-            for j in i:
-                trolls.add(j)
-                all_sprites.add(j)
-        if k == 1:
-            for j in i:
-                fruits.add(j)
-                j.reset_animation()
-        if k == 2:
-            for j in i:
-                iceblocks.add(j)
-        if k == 3:
-            for j in i:
-                players.add(j)
-                all_sprites.add(j)
+    simulation.reset(simulation.level)
+
+# Botões das telas de menu
+class ScreenButtons:
+    """The buttons of one screen, indexed by the grid cells their rects cover.
+
+    Each button is a pressed image, loaded on first use and shown at alpha 180 while the mouse is over it.
+    """
+    cell = 64  # px
+
+    def __init__(self, buttons):
+        self.buttons = buttons  # name -> (pressed image path, rect)
+        self.surfaces = {}  # name -> converted pressed image, filled by load()
+        self.hovered = None
+        self.index = {}
+        for name, (path, rect) in buttons.items():
+            for col in range(rect.left // self.cell, (rect.right - 1) // self.cell + 1):
+                for row in range(rect.top // self.cell, (rect.bottom - 1) // self.cell + 1):
+                    self.index.setdefault((col, row), []).append(name)
+
+    def hit(self, pos):
+        """Return the name of the button at pos, or None."""
+        for name in self.index.get((pos[0] // self.cell, pos[1] // self.cell), ()):
+            if self.buttons[name][1].collidepoint(pos):
+                return name
+        return None
+
+    def hover(self, pos):
+        """Moves the hover to the button at pos. Return True if a button changed."""
+        self.load()  # a click can switch screens before show() runs, with motion in the same batch of events
+        name = self.hit(pos)
+        if name == self.hovered:
+            return False
+        if self.hovered is not None:
+            self.surfaces[self.hovered].set_alpha(0)
+        if name is not None:
+            self.surfaces[name].set_alpha(180)
+        self.hovered = name
+        return True
+
+    def show(self, pos):
+        """Sets every button for the mouse at pos, when the screen is switched to."""
+        self.load()
+        self.hovered = self.hit(pos)
+        for name, surface in self.surfaces.items():
+            surface.set_alpha(180 if name == self.hovered else 0)
+
+    def files(self):
+        return [(path, None) for path, rect in self.buttons.values()]
+
+    def load(self):
+        """Converts the pressed images the first time they are needed."""
+        if not self.surfaces:
+            for name, (path, rect) in self.buttons.items():
+                self.surfaces[name] = assets.take(path).convert_alpha()
+
+    def draw(self, surface):
+        self.load()
+        for name, (path, rect) in self.buttons.items():
+            surface.blit(self.surfaces[name], rect)
 
 #Instancias do Minimenu e derivados
 if True:
-    icons = [pygame.transform.scale_by(pygame.image.load(f"Resources/minimenu/{i}.png"),3) for i in ["restart","pause","music"]]
-    for icon in icons:
-        icon.set_colorkey((131, 206, 82, 255))
+    icon_files = [(f"Resources/minimenu/{i}.png", 3) for i in ["restart","pause","music"]]
+    icons = []  # filled by load_icons()
     rects = []
-    continue_button_surf = pygame.image.load("Resources/minimenu/pressed_pause_button.png")
-    continue_button_rect = pygame.Rect(SCREEN_WIDTH//2 - 209//2, SCREEN_HEIGHT//2 - 7, 209, 54)
-    back_menu_button_surf = pygame.image.load("Resources/minimenu/pressed_back_menu_button.png")
+    continue_button_path = "Resources/minimenu/pressed_pause_button.png"
+    continue_button_rect = pygame.Rect(SCREEN_WIDTH//2 + 2 - 209//2, SCREEN_HEIGHT//2 - 8, 209, 58)
+    back_menu_button_path = "Resources/minimenu/pressed_back_menu_button.png"
     back_menu_button_rect = pygame.Rect(296,365,228,54)
-    buttons = {continue_button_surf : (continue_button_rect,True), back_menu_button_surf :(back_menu_button_rect,True)}
+
+def load_icons():
+    """Converts the minimenu icons the first time the HUD is drawn."""
+    if not icons:
+        for path, how in icon_files:
+            icon = assets.take(path, how).convert_alpha()
+            icon.set_colorkey((131, 206, 82, 255))
+            icons.append(icon)
 
 #Instancias do Start e derivados
 if True:
-    play_button_surf = pygame.image.load("Resources/menu/pressed_play_button.png")
+    play_button_path = "Resources/menu/pressed_play_button.png"
     play_button_rect = pygame.Rect(496, 129, 281, 105)
 
-    help_button_surf = pygame.image.load("Resources/menu/pressed_help_button.png")
+    help_button_path = "Resources/menu/pressed_help_button.png"
     help_button_rect = pygame.Rect(494, 265, 281, 105)
 
-    credits_button_surf = pygame.image.load("Resources/menu/pressed_credits_button.png")
+    credits_button_path = "Resources/menu/pressed_credits_button.png"
     credits_button_rect = pygame.Rect(494, 396, 281, 105)
 
-    buttons.update({
-        play_button_surf: (play_button_rect,True),
-        help_button_surf: (help_button_rect,True),
-        credits_button_surf: (credits_button_rect,True)
-    })
-
 #Instancias da Interface dos Níveis e derivados
 if True:
-    lv1_button_surf = pygame.image.load("Resources/levels_interface/pressed_lvl1_button.png")
+    lv1_button_path = "Resources/levels_interface/pressed_lvl1_button.png"
     lv1_button_rect = pygame.Rect(269, 101, 91, 89)
-    lv2_button_surf = pygame.image.load("Resources/levels_interface/pressed_lvl2_button.png")
+    lv2_button_path = "Resources/levels_interface/pressed_lvl2_button.png"
     lv2_button_rect = pygame.Rect(268 + 92, 101, 92, 89)
-    lv3_button_surf = pygame.image.load("Resources/levels_interface/pressed_lvl3_button.png")
+    lv3_button_path = "Resources/levels_interface/pressed_lvl3_button.png"
     lv3_button_rect = pygame.Rect(268 + 93*2 -1, 101, 93, 89)
-    back_button_surf = pygame.image.load("Resources/levels_interface/pressed_back_button.png")
+    back_button_path = "Resources/levels_interface/pressed_back_button.png"
     back_button_rect = pygame.Rect(301,509,211,101)
 
     lv_access = {    
-        0: (lv1_button_rect,True,lv1_button_surf),
-        1: (lv2_button_rect,False,lv2_button_surf),
-        2: (lv3_button_rect,False,lv3_button_surf)}
-
-    buttons.update({
-        back_button_surf:(back_button_rect,True)
-    })
+        0: (lv1_button_rect,True,lv1_button_path),
+        1: (lv2_button_rect,False,lv2_button_path),
+        2: (lv3_button_rect,False,lv3_button_path)}
 
 #Instancias do Help e derivados
 if True:
-    menu_button_surf = pygame.image.load("Resources/help/pressed_back_menu_button.png")
-    menu_button_rect = pygame.Rect(288,483,228,54)
-
-    buttons.update({
-        menu_button_surf:(menu_button_rect,True)
-    })
+    help_menu_button_path = "Resources/help/pressed_back_menu_button.png"
+    help_menu_button_rect = pygame.Rect(288,483,228,54)
 
 #Instancias do Credits e derivados
 if True:
-    menu_button_surf = pygame.image.load("Resources/credits/pressed_back_menu_button.png")
+    menu_button_path = "Resources/credits/pressed_back_menu_button.png"
     menu_button_rect = pygame.Rect(288,483,228,54)
 
-    buttons.update({
-        menu_button_surf:(menu_button_rect,True)
-    })
+# Botões de cada tela; as imagens são carregadas no primeiro uso (ou pelo warm_up)
+screen_buttons = {
+    "paused": ScreenButtons({"continue": (continue_button_path, continue_button_rect),
+                             "back_menu": (back_menu_button_path, back_menu_button_rect)}),
+    "start": ScreenButtons({"play": (play_button_path, play_button_rect),
+                            "help": (help_button_path, help_button_rect),
+                            "credits": (credits_button_path, credits_button_rect)}),
+    "levels": ScreenButtons({"lv1": (lv1_button_path, lv1_button_rect),
+                             "lv2": (lv2_button_path, lv2_button_rect),
+                             "lv3": (lv3_button_path, lv3_button_rect),
+                             "back": (back_button_path, back_button_rect)}),
+    "help": ScreenButtons({"menu": (help_menu_button_path, help_menu_button_rect)}),
+    "credits": ScreenButtons({"menu": (menu_button_path, menu_button_rect)}),
+}
+
+# Idle pacing for screens that only change on input
+adaptive_pacing = True
+static_screens = ["start", "levels", "paused", "help", "credits"]
+IDLE_TIMEOUT = 500  # ms to block on pygame.event.wait before looping anyway
+
+# Gameplay assets, as (assets, finish) steps. Only the title screen is loaded before the first frame;
+# then the workers decode every step's assets and the menus finish one decoded step per loop, so the
+# first level starts without a hitch.
+warm_up = (
+    [([], lambda: levels[0]),
+     ([(ScreenCache.interfaces["levels"], None)], lambda: screen_cache.get("levels")),
+     (screen_buttons["levels"].files(), screen_buttons["levels"].load),
+     (icon_files, load_icons),
+     (screen_buttons["paused"].files(), screen_buttons["paused"].load),
+     ([(ScreenCache.interfaces["background"], None)], lambda: screen_cache.get("background")),
+     (score_hud.files(), lambda: score_hud.update(0))]
+    + [(animation_frames.files(key), lambda key=key: animation_frames.get(*key)) for key in FrameCache.animations]
+    + [([(path, "sound")], lambda name=name: audio.get(name)) for name, path in Audio.files.items()]
+)
+warm_up_total = len(warm_up)
+LOAD_POLL = 5  # ms to wait for the workers when no warm_up step is decoded yet
+startup_times = {}  # perf_counter() when the first frame was shown and when warm_up finished
+
+class LoadingBar:
+    """Thin bar along the bottom of the menus, filled as warm_up steps finish."""
+    def __init__(self, rect, color=(255, 255, 255), back=(24, 52, 96)):
+        self.rect = pygame.Rect(rect)
+        self.color = color
+        self.back = back
+        self.shown = None  # steps done when it was last drawn
+
+    def draw(self, surface, done, total):
+        """Draws the bar and return its rect."""
+        surface.fill(self.back, self.rect)
+        surface.fill(self.color, (self.rect.x, self.rect.y, self.rect.width * done // total, self.rect.height))
+        self.shown = done
+        return self.rect
+
+loading_bar = LoadingBar((0, SCREEN_HEIGHT - 6, SCREEN_WIDTH, 6))
+
+# Frame timing: F3 shows the overlay, timing_csv streams every frame to a file
+timing_csv = None  # e.g. "timings.csv"
+TIMING_KEY = pygame.K_F3
+
+class FrameTimer:
+    """Times each phase of the main loop.
+
+    mark(phase) charges the time since the previous mark to phase; end_frame() closes the frame.
+    """
+    phases = ["events", "assets", "fruits", "sprites", "grid", "rules", "transparency", "hud", "draw", "display", "idle"]
+
+    def __init__(self, csv_path=None, window=120, refresh=15, bottomleft=(10, SCREEN_HEIGHT - 10)):
+        self.csv_path = csv_path
+        self.csv = None
+        self.shown = False
+        self.window = window
+        self.refresh = refresh  # frames between overlay redraws
+        self.bottomleft = bottomleft
+        self.history = {phase: [] for phase in self.phases}
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.last = time.perf_counter()
+        self.frames = 0
+        self.font = None
+        self.surface = None
+        self.renders = 0
+
+    @property
+    def enabled(self):
+        return self.shown or self.csv_path is not None
+
+    def toggle(self):
+        """Shows or hides the overlay; timing starts from a clean frame."""
+        self.shown = not self.shown
+        for phase in self.phases:
+            self.history[phase].clear()
+            self.current[phase] = 0.0
+        if self.shown:
+            self.render()
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self, screen_name):
+        if not self.enabled:
+            return
+        self.frames += 1
+        if self.csv_path is not None:
+            if self.csv is None:
+                self.csv = open(self.csv_path, "w", newline="")
+                self.csv.write(",".join(["frame", "screen"] + self.phases + ["total"]) + "\n")
+            row = [self.current[phase] * 1000 for phase in self.phases]
+            self.csv.write(",".join([str(self.frames), screen_name] + [f"{ms:.3f}" for ms in row + [sum(row)]]) + "\n")
+        if self.shown:
+            for phase in self.phases:
+                history = self.history[phase]
+                history.append(self.current[phase])
+                if len(history) > self.window:
+                    del history[0]
+            if self.frames % self.refresh == 0:
+                self.render()
+        for phase in self.phases:
+            self.current[phase] = 0.0
+
+    def stats(self, phase):
+        """(p50, p95, max) in ms over the rolling window."""
+        times = sorted(self.history[phase])
+        if not times:
+            return 0.0, 0.0, 0.0
+        return (times[len(times) // 2] * 1000, times[min(len(times) - 1, len(times) * 95 // 100)] * 1000,
+                times[-1] * 1000)
+
+    def render(self):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+            line = self.font.get_linesize()
+            self.surface = pygame.Surface((210, line * (len(self.phases) + 1) + 8), pygame.SRCALPHA)
+        line = self.font.get_linesize()
+        self.surface.fill((0, 0, 0, 170))
+        rows = [("ms", "p50", "p95", "max")]
+        rows += [(phase,) + tuple(f"{ms:.2f}" for ms in self.stats(phase)) for phase in self.phases]
+        for y, row in enumerate(rows):
+            for x, text in zip((4, 100, 136, 172), row):
+                self.surface.blit(self.font.render(text, True, (255, 255, 255)), (x, 4 + y * line))
+        self.renders += 1
+
+    def overlay(self):
+        """(image, rect, version) for BoardRenderer.draw."""
+        return self.surface, self.surface.get_rect(bottomleft=self.bottomleft), self.renders
+
+    def close(self):
+        if self.csv is not None:
+            self.csv.close()
+            self.csv = None
+
+frame_timer = FrameTimer(csv_path=timing_csv)
 
 # Game loop
-while True:
-    # Play music:
-    play_music_for_screen(active_screen)
-
-    for event in pygame.event.get():
-        # Closing the game window
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-
-        # Pressed down button system
-        if True:
-            for button in buttons:
-                if buttons[button][0].collidepoint(pygame.mouse.get_pos()) and buttons[button][1]:
-                    button.set_alpha(180)
-                else:
-                    button.set_alpha(0)
-            for lvl in lv_access:
-                #if lv_access[lvl][0].collidepoint(pygame.mouse.get_pos()) and lv_access[lvl][1]: esse é para não dar hover em 
-                #níveis que vc ainda não pode jogar
-
-                if lv_access[lvl][0].collidepoint(pygame.mouse.get_pos()): # esse é para dar hover independentemente se 
-                #vc já passou ou não no nível
-                    lv_access[lvl][2].set_alpha(180)
-                else:
-                    lv_access[lvl][2].set_alpha(0)
-
-        #All buttons system
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            for j, rect in enumerate(rects):
-                if rect.collidepoint(event.pos) and active_screen == "gaming" and not players.sprites()[0].winning: 
-                    if j == 0 and not players.sprites()[0].morrendo:
+def main():
+    global active_screen, music
+    redraw = True
+    drawn_screen = None
+    buttons_shown = None  # screen whose buttons were last set for the mouse
+
+    while True:
+        # Play music:
+        audio.music_for(active_screen)
+
+        static = adaptive_pacing and active_screen in static_screens
+        events = pygame.event.get()
+        if warm_up and drawn_screen is not None and active_screen in static_screens:
+            frame_timer.mark("events")
+            step = next((step for step in warm_up if assets.ready(step[0])), None)
+            if step is not None:
+                warm_up.remove(step)
+                step[1]()
+                frame_timer.mark("assets")
+                if not warm_up:
+                    startup_times["gameplay_ready"] = time.perf_counter()
+                    redraw = True  # takes the loading bar down
+            elif static and not events:
+                # Nothing decoded yet: wait a little for the workers, or for input
+                events = [pygame.event.wait(LOAD_POLL)]
+                frame_timer.mark("idle")
+        elif static and not events and not redraw and active_screen == drawn_screen:
+            frame_timer.mark("events")
+            events = [pygame.event.wait(IDLE_TIMEOUT)]
+            frame_timer.mark("idle")
+
+        for event in events:
+            # Closing the game window
+            if event.type == pygame.QUIT:
+                simulation.finish()
+                frame_timer.close()
+                assets.close()
+                pygame.quit()
+                sys.exit()
+
+            if event.type == pygame.KEYDOWN and event.key == TIMING_KEY:
+                frame_timer.toggle()
+
+            # Anything but plain mouse motion may change what is on screen
+            if event.type not in (pygame.MOUSEMOTION, pygame.NOEVENT):
+                redraw = True
+
+            # Hover: only mouse motion can change it, and only on the visible screen's buttons
+            if event.type == pygame.MOUSEMOTION and active_screen in screen_buttons:
+                if screen_buttons[active_screen].hover(event.pos):
+                    redraw = True
+                    # The level under the mouse is the likeliest pick: its art goes to the front of the queue
+                    hovered = screen_buttons[active_screen].hovered
+                    if active_screen == "levels" and hovered in ("lv1", "lv2", "lv3") and lv_access[int(hovered[2]) - 1][1]:
+                        assets.prefetch(level_assets(int(hovered[2]) - 1), assets.URGENT)
+
+            #All buttons system
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if active_screen == "gaming":
+                    for j, rect in enumerate(rects):
+                        if rect.collidepoint(event.pos) and not players.sprites()[0].winning:
+                            if j == 0 and not players.sprites()[0].morrendo:
+                                restart()
+                            elif j == 1:
+                                active_screen = "paused"
+                            elif j == 2:
+                                if music:
+                                    audio.stop_music()
+                                    music = False
+                                else:
+                                    audio.resume_music()
+                                    music = True
+
+                elif active_screen == "paused":
+                    clicked = screen_buttons["paused"].hit(event.pos)
+                    if clicked == "continue":
+                        active_screen = "gaming"
+                    elif clicked == "back_menu":
                         restart()
-                    elif j == 1:
-                        active_screen = "paused"
-                    elif j == 2:
-                        if music:
-                            pygame.mixer.music.stop()
-                            music = False
-                        else:
-                            pygame.mixer.music.play(-1)
-                            music = True
-
-            if active_screen == "paused":
-                if continue_button_rect.collidepoint(event.pos):
-                    active_screen = "gaming"
-                elif back_menu_button_rect.collidepoint(event.pos) :
-                    restart()
-                    active_screen = "start"
-
-            elif active_screen == "start":
-                if play_button_rect.collidepoint(event.pos):
-                    active_screen = "levels"
-                elif help_button_rect.collidepoint(event.pos):
-                    active_screen = "help"
-                elif credits_button_rect.collidepoint(event.pos):
-                    active_screen = "credits"
-
-            elif active_screen == "help":
-                if menu_button_rect.collidepoint(event.pos):
-                    active_screen = "start"
-
-            elif active_screen == "credits":
-                if menu_button_rect.collidepoint(event.pos):
-                    active_screen = "start"
-
-            elif active_screen == "levels":
-                if lv1_button_rect.collidepoint(event.pos):
-                    active_screen = "gaming"
-                    lv_atual = 1
-                    restart()
-                elif lv2_button_rect.collidepoint(event.pos) and lv_access[1][1]:
-                    active_screen = "gaming"
-                    lv_atual = 2
-                    restart()
-                elif lv3_button_rect.collidepoint(event.pos) and lv_access[2][1]:
-                    active_screen = "gaming"
-                    lv_atual = 3
-                    restart()
-                elif back_button_rect.collidepoint(event.pos):
-                    active_screen = "start"
-
-    # Gaming State
-    if active_screen == "gaming":
-
-        # Draw background
-        screen.blit(background_surface, background_rect)
-        screen.blit(iglu_inv_surf, iglu_inv_rect)
-
-        # Update sprites
-        fruits.update()
-        all_sprites.update()
-
-        # Grid-moving system for player and trolls
-        for player in all_sprites:
-            if player.counter > 0 and not player.duvido and not player.winning:
-                player.andando = True
-            else:
-                player.andando = False
-            if not player.cuspindo and not player.destroying and not player.winning:
-                if player.tra:
-                    if player.counter > 0:
-                        player.counter -= 1
-                        player.rect.y -= player.speed
-                        if player.counter == 1:
-                            player.rect.y -= player.speed_end
-                elif player.fre:
-                    if player.counter > 0:
-                        player.counter -= 1
-                        player.rect.y += player.speed
-                        if player.counter == 1:
-                            player.rect.y += player.speed_end
-                elif player.dir:
-                    if player.counter > 0:
-                        player.counter -= 1
-                        player.rect.x += player.speed
-                elif player.esq:
-                    if player.counter > 0:
-                        player.counter -= 1
-                        player.rect.x -= player.speed
-
-        # Add tranparency to the iceblocks covering fruits
-        for fruta in fruits:
-            for gelo in iceblocks:
-                if fruta.rect.colliderect(gelo.rect):
-                    gelo.image.set_alpha(200)
-
-        # Draw everything
-        if not players.sprites()[0].winning:
-            fruits.draw(screen)
-            all_sprites.draw(screen)
-            iceblocks.draw(screen)
-        else:
-            fruits.draw(screen)
-            iceblocks.draw(screen)
-            all_sprites.draw(screen)
+                        active_screen = "start"
 
-        # Montando layout do proximo round
-        now = pygame.time.get_ticks()
-        for player in players:
-            if player.done:
-                counter = 0
-                round_atual += 1
-                player.done = False
-                fruits.empty()
-                if round_atual != 1:
-                    round = lvs[lv_atual-1][round_atual]
-                    round[3] = []
-                    round[2] = []
-                    round[0] = []
-                    for k, i in enumerate(round):
-                        if k == 0:
-                            for j in i:
-                                trolls.add(j)
-                                all_sprites.add(j)
-                        if k == 1:
-                            for j in i:
-                                fruits.add(j)
-                        if k == 2:
-                            for j in i:
-                                iceblocks.add(j)
-                        if k == 3:
-                            for j in i:
-                                players.add(j)
-                                all_sprites.add(j)
-
-        # Check Winning Condition
-        for player in players:
-            if len(fruits) == 0:
-                if round_atual == round_final:
-                    player.winning = True
-                    if counter == 0:
-                        player.winning_timer = pygame.time.get_ticks()
-                        counter = 1
-                    if now - player.winning_timer >= 5000:
-                        player.winning = False
-                        restart()
-                        if lv_atual != lv_final:
-                            lv_access[lv_atual] = (lv_access[lv_atual][0],True,lv_access[lv_atual][2])
+                elif active_screen == "start":
+                    clicked = screen_buttons["start"].hit(event.pos)
+                    if clicked == "play":
                         active_screen = "levels"
-                else:
-                    player.done = True
-
-        # Check if player lost the level
-        for player in players:
-            if player.morto:
-                restart()
+                    elif clicked in ("help", "credits"):
+                        active_screen = clicked
+
+                elif active_screen in ("help", "credits"):
+                    clicked = screen_buttons[active_screen].hit(event.pos)
+                    if clicked == "menu":
+                        active_screen = "start"
+
+                elif active_screen == "levels":
+                    clicked = screen_buttons["levels"].hit(event.pos)
+                    if clicked in ("lv1", "lv2", "lv3"):
+                        level = int(clicked[2])
+                        if lv_access[level - 1][1]:
+                            active_screen = "gaming"
+                            simulation.reset(level)
+                    elif clicked == "back":
+                        active_screen = "start"
+
+        # A screen just switched to sets its buttons for where the mouse already is
+        if active_screen != buttons_shown:
+            buttons_shown = active_screen
+            if active_screen in screen_buttons:
+                screen_buttons[active_screen].show(pygame.mouse.get_pos())
+            # Whichever level is picked next, its art is decoded before the rest of warm_up
+            if active_screen == "levels":
+                for index, (rect, unlocked, path) in lv_access.items():
+                    if unlocked:
+                        assets.prefetch(level_assets(index), assets.NEXT)
+
+        # Nothing changed on a static screen: keep the last frame and wait for input
+        if static and not redraw and active_screen == drawn_screen:
+            if warm_up and loading_bar.shown != warm_up_total - len(warm_up):
+                pygame.display.update(loading_bar.draw(screen, warm_up_total - len(warm_up), warm_up_total))
+            continue
+        redraw = False
+        last_drawn = drawn_screen
+        drawn_screen = active_screen
+        dirty = None
+        frame_timer.mark("events")
+
+        # Gaming State
+        if active_screen == "gaming":
+            state = simulation.step()
+            if state["result"] == "won":
+                if simulation.level != lv_final:
+                    lv_access[simulation.level] = (lv_access[simulation.level][0],True,lv_access[simulation.level][2])
                 active_screen = "levels"
+            elif state["result"] == "lost":
+                active_screen = "levels"
+
+            # Add tranparency to the iceblocks covering fruits
+            ice_transparency.update()
+            frame_timer.mark("transparency")
 
-        # Score HUD
-        if True:
-            digit_names = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
-            scores = {"p":pygame.transform.scale_by(pygame.image.load(f"Resources/score/player1.png"),2)}
-            scores["p"].set_colorkey((131, 206, 82, 255))
-            for i, name in enumerate(digit_names):
-                img = pygame.transform.scale_by(pygame.image.load(f"Resources/score/{name}.png"),2.5)
-                img.set_colorkey((131, 206, 82, 255))
-                scores[i] = img
+            # Score HUD
             for player in players:
-                score_str = str(player.pontos)
-                while len(score_str) < 6:
-                    score_str = "0" + score_str
-                screen.blit(scores["p"], scores["p"].get_rect(topleft=(60, 2)))
-                for index, digit in enumerate(score_str):
-                    x = 110 + index * 25
-                    y = 0 + 20
-                    screen.blit(scores[int(digit)], scores[int(digit)].get_rect(topleft=(x, y)))
-
-        # MiniMenu HUD
-        if True:
-            x = -120
-            rects.clear()
-            for i in icons:
-                if i == icons[-1]:
-                    x = -30
-                rect = i.get_rect(topright = (800+x,15))
-                screen.blit(i, rect)
-                rects.append(rect)
-                x += 40
-
-    # Pause State
-    elif active_screen == "paused":
-        paused_interface = pygame.image.load("Resources/minimenu/Paused.webp")
-        paused_rect = paused_interface.get_rect(center = (SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
-        continue_button_rect = pygame.Rect(SCREEN_WIDTH//2 + 2 - 209//2, SCREEN_HEIGHT//2 - 8, 209, 58)
-        screen.blit(paused_interface,paused_rect)
-        screen.blit(continue_button_surf,continue_button_rect)
-        screen.blit(back_menu_button_surf,back_menu_button_rect)
-
-    # Start State
-    elif active_screen == "start":
-        start_interface = pygame.image.load("Resources/menu/start.png")
-        start_rect = start_interface.get_rect(center = (SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
-        screen.blit(start_interface,start_rect)
-        screen.blit(play_button_surf,play_button_rect)
-        screen.blit(help_button_surf,help_button_rect)
-        screen.blit(credits_button_surf,credits_button_rect)
-
-    # Levels State
-    elif active_screen == "levels":
-        start_interface = pygame.image.load("Resources/levels_interface/levels.png")
-        start_rect = start_interface.get_rect(center = (SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
-        screen.blit(start_interface,start_rect)
-        screen.blit(lv1_button_surf,lv1_button_rect)
-        screen.blit(lv2_button_surf,lv2_button_rect)
-        screen.blit(lv3_button_surf,lv3_button_rect)
-        screen.blit(back_button_surf,back_button_rect)
-
-    # Help State
-    elif active_screen == "help":
-        help_interface = pygame.image.load("Resources/help/background.png")
-        help_rect = help_interface.get_rect(center = (SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
-        screen.blit(help_interface,help_rect)
-        screen.blit(menu_button_surf,menu_button_rect)
-
-    # Credits State
-    elif active_screen == "credits":
-        credits_interface = pygame.image.load("Resources/credits/background.png")
-        credits_rect = credits_interface.get_rect(center = (SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
-        screen.blit(credits_interface,credits_rect)
-        screen.blit(menu_button_surf,menu_button_rect)
-
-    # Update the screen
-    pygame.display.update()
-    clock.tick(60)
+                score_hud.update(player.pontos)
+            overlays = [(score_hud.surface, score_hud.surface.get_rect(topleft=score_hud.topleft), score_hud.renders)]
+
+            # MiniMenu HUD
+            if True:
+                x = -120
+                load_icons()
+                rects.clear()
+                for i in icons:
+                    if i == icons[-1]:
+                        x = -30
+                    rect = i.get_rect(topright = (800+x,15))
+                    overlays.append((i, rect, 0))
+                    rects.append(rect)
+                    x += 40
+            if frame_timer.shown:
+                overlays.append(frame_timer.overlay())
+            frame_timer.mark("hud")
+
+            # Draw only what moved since the last frame
+            if last_drawn != "gaming":
+                board_renderer.invalidate()
+            camera.follow(players.sprites()[0].rect)
+            background_surface, background_rect = board.background()
+            dirty = board_renderer.draw(background_surface, background_rect, players.sprites()[0].winning, overlays)
+
+        # Pause State
+        elif active_screen == "paused":
+            paused_interface, paused_rect = screen_cache.get("paused")
+            screen.blit(paused_interface,paused_rect)
+            screen_buttons["paused"].draw(screen)
+
+        # Start State
+        elif active_screen == "start":
+            start_interface, start_rect = screen_cache.get("start")
+            screen.blit(start_interface,start_rect)
+            screen_buttons["start"].draw(screen)
+
+        # Levels State
+        elif active_screen == "levels":
+            levels_interface, levels_rect = screen_cache.get("levels")
+            screen.blit(levels_interface,levels_rect)
+            screen_buttons["levels"].draw(screen)
+
+        # Help State
+        elif active_screen == "help":
+            help_interface, help_rect = screen_cache.get("help")
+            screen.blit(help_interface,help_rect)
+            screen_buttons["help"].draw(screen)
+
+        # Credits State
+        elif active_screen == "credits":
+            credits_interface, credits_rect = screen_cache.get("credits")
+            screen.blit(credits_interface,credits_rect)
+            screen_buttons["credits"].draw(screen)
+
+        if drawn_screen != "gaming" and warm_up:
+            loading_bar.draw(screen, warm_up_total - len(warm_up), warm_up_total)
+        if drawn_screen != "gaming" and frame_timer.shown:
+            screen.blit(*frame_timer.overlay()[:2])
+        screen_cache.evict_idle()
+        frame_timer.mark("draw")
+
+        # Update the screen
+        if dirty is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty)
+        frame_timer.mark("display")
+        if "first_frame" not in startup_times:
+            startup_times["first_frame"] = time.perf_counter()
+            assets.prefetch(asset for step in warm_up for asset in step[0])
+        audio.end_frame()
+        clock.tick(60)
+        frame_timer.mark("idle")
+        frame_timer.end_frame(drawn_screen)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Packs the animation frames into atlases that the game memory-maps instead of opening every file.
+
+    python pack_assets.py
+
+Every frame in main.FrameCache.animations goes on a shelf of its character's
+atlas (choco, troll). The atlases' raw RGBA pixels are written one after the
+other to Resources/frames.atlas, each starting on a page boundary, and
+Resources/frames.json records where every frame is. At startup the game maps
+frames.atlas and cuts each frame out of it as a subsurface, so loading all
+frames is two file reads instead of one open and one PNG decode per frame.
+Run it again after changing any frame. Without these two files the game
+loads the frames one by one, as before.
+"""
+import json
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame  # noqa: E402
+import main as game  # noqa: E402
+
+WIDTH = 512  # px per atlas row
+PAGE = 4096
+
+
+def shelves(images, width=WIDTH):
+    """Places images tallest first, left to right in rows. Return {path: (x, y)} and the atlas height."""
+    places = {}
+    x = y = shelf = 0
+    for path, image in sorted(images.items(), key=lambda item: -item[1].get_height()):
+        w, h = image.get_size()
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        places[path] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    return places, y + shelf
+
+
+def main():
+    characters = {}
+    for key in game.FrameCache.animations:
+        for path, how in game.animation_frames.files(key):
+            characters.setdefault(key[0], {})[path] = pygame.image.load(path)
+
+    index = {"format": "RGBA", "atlases": [], "frames": {}}
+    data = bytearray()
+    for name, images in characters.items():
+        places, height = shelves(images)
+        atlas = pygame.Surface((WIDTH, height), pygame.SRCALPHA, 32)
+        for path, (x, y) in places.items():
+            atlas.blit(images[path], (x, y), special_flags=pygame.BLEND_RGBA_MAX)  # a copy: the atlas is all zeros
+            index["frames"][path] = [len(index["atlases"]), x, y, *images[path].get_size()]
+        data += bytes(-len(data) % PAGE)
+        index["atlases"].append({"name": name, "offset": len(data), "size": [WIDTH, height]})
+        data += pygame.image.tobytes(atlas, "RGBA")
+
+    with open(game.ARCHIVE, "wb") as file:
+        file.write(data)
+    with open(game.ARCHIVE_INDEX, "w") as file:
+        json.dump(index, file, indent=1)
+    print(f"{len(index['frames'])} frames in {len(index['atlases'])} atlases, {len(data) // 1024} KB: "
+          f"{game.ARCHIVE}, {game.ARCHIVE_INDEX}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Replays a recorded session headless and checks it against its state hashes.
+
+    python replay.py replays/lv1-123456.json
+
+Sessions are recorded when save_replays is turned on in main.py, or by
+saving simulation.recording from a bot.
+"""
+import sys
+import time
+
+from headless import Recording, simulation
+
+
+def main(paths):
+    failed = False
+    for path in paths:
+        recording = Recording.load(path)
+        start = time.perf_counter()
+        mismatch = simulation.replay(recording)
+        elapsed = time.perf_counter() - start
+        speed = recording.ticks / elapsed if elapsed else 0
+        if mismatch is None:
+            print(f"{path}: ok, {recording.ticks} ticks in {elapsed:.2f}s ({speed:.0f} ticks/s)")
+        else:
+            failed = True
+            print(f"{path}: state differs by tick {mismatch}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,39 @@
+"""Checks that restarting a level takes less than one frame.
+
+    python restart_timing.py [repeats]
+
+Times simulation.reset() on every level: the first, cold restart (level file
+parsed, character frames decoded) and the median of the warm ones after it,
+plus the switch to each following round. Exits with 1 if anything takes
+longer than a frame at 60 fps.
+"""
+import sys
+import time
+
+from headless import simulation
+from main import levels
+
+FRAME = 1 / 60
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main(repeats=20):
+    slow = False
+    for level in range(1, len(levels) + 1):
+        cold = timed(simulation.reset, level)
+        warm = sorted(timed(simulation.reset, level) for _ in range(repeats))[repeats // 2]
+        rounds = [timed(simulation.next_round) for _ in levels[level - 1][1:]]
+        worst = max([cold, warm] + rounds)
+        slow = slow or worst >= FRAME
+        print(f"level {level}: restart {cold * 1000:.2f} ms cold, {warm * 1000:.2f} ms warm, "
+              f"next round {max(rounds, default=0) * 1000:.2f} ms" + ("  SLOWER THAN A FRAME" if worst >= FRAME else ""))
+    return 1 if slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:2])))
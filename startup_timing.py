@@ -0,0 +1,56 @@
+"""Measures how long the game takes to show its title screen and to be ready to play.
+
+    python startup_timing.py [runs]
+
+Every run starts the game in a fresh interpreter and reports, from the moment
+that interpreter starts importing, when pygame was imported, when main.py had
+finished its module setup, when the first frame was on screen and when the
+gameplay assets (level, characters, sounds, HUD) were loaded. Nothing is
+clicked, so the last one is the warm-up the title screen does while idle.
+"""
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+STAGES = ["pygame imported", "main imported", "first frame", "gameplay ready"]
+
+
+def run_game():
+    start = time.perf_counter()
+    import pygame
+    pygame_imported = time.perf_counter()
+    import main as game
+    imported = time.perf_counter()
+
+    def quit_when_ready():
+        while "gameplay_ready" not in game.startup_times:
+            time.sleep(0.001)
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    threading.Thread(target=quit_when_ready, daemon=True).start()
+    try:
+        game.main()
+    except SystemExit:
+        pass
+    times = [pygame_imported, imported, game.startup_times["first_frame"], game.startup_times["gameplay_ready"]]
+    print(json.dumps([(t - start) * 1000 for t in times]))
+
+
+def main(runs=5):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, __file__, "--child"], capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    for stage, times in zip(STAGES, zip(*results)):
+        print(f"{stage:>16}: {statistics.median(times):7.1f} ms (median of {runs}, best {min(times):.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--child"]:
+        run_game()
+    else:
+        sys.exit(main(*map(int, sys.argv[1:2])))
@@ -0,0 +1,85 @@
+"""Checks that the gaming screen reads nothing from disk once it is warm.
+
+    python steady_state.py [frames]
+
+Plays every round of every level once to warm the caches, then restarts each
+level and plays that many gaming frames on it the way the main loop does
+(simulation step, ice transparency, score HUD, board drawing) with random input. It counts image,
+sound and file loads and AssetLoader decodes, and checks that the score HUD
+is only re-rendered on frames where the score changed. Exits with 1 if
+anything was loaded or rendered when it should not have been.
+"""
+import builtins
+import random
+import sys
+
+import pygame
+
+from headless import simulation
+import main as game
+
+ACTIONS = [["right"], ["left"], ["up"], ["down"], ["ice"], ["break"], []]
+
+
+def frame(actions):
+    """One gaming frame of main(), minus the events, the minimenu and display.update."""
+    simulation.step(actions)
+    game.ice_transparency.update()
+    player = game.players.sprites()[0]
+    game.score_hud.update(player.pontos)
+    overlays = [(game.score_hud.surface, game.score_hud.surface.get_rect(topleft=game.score_hud.topleft),
+                 game.score_hud.renders)]
+    game.camera.follow(player.rect)
+    background_surface, background_rect = game.board.background()
+    game.board_renderer.draw(background_surface, background_rect, player.winning, overlays)
+
+
+def counting(loads, name, function):
+    def load(*args, **kwargs):
+        loads[name] += 1
+        return function(*args, **kwargs)
+    return load
+
+
+def main(frames=1000):
+    game.board_renderer = game.BoardRenderer(game.screen, game.fruits, game.all_sprites, game.iceblocks, game.camera)
+    for level in range(1, len(game.levels) + 1):
+        for round in range(1, len(game.levels[level - 1]) + 1):
+            simulation.reset(level, round, 0)
+            frame([])
+
+    loads = dict.fromkeys(["image", "sound", "file"], 0)
+    patched = [(pygame.image, "load"), (pygame.mixer, "Sound"), (builtins, "open")]
+    originals = [getattr(module, name) for module, name in patched]
+    for (module, name), original, kind in zip(patched, originals, loads):
+        setattr(module, name, counting(loads, kind, original))
+    failed = False
+    try:
+        rng = random.Random(0)
+        for level in range(1, len(game.levels) + 1):
+            loads.update(dict.fromkeys(loads, 0))
+            decodes = game.assets.decodes
+            simulation.reset(level, 1, 0)
+            extra = changes = 0
+            actions = []
+            for tick in range(frames):
+                if tick % 20 == 0:
+                    actions = rng.choice(ACTIONS)
+                pontos, renders = game.score_hud.pontos, game.score_hud.renders
+                frame(actions)
+                changed = game.score_hud.pontos != pontos
+                changes += changed
+                extra += game.score_hud.renders - renders - changed
+            read = sum(loads.values()) + game.assets.decodes - decodes
+            bad = read or extra
+            failed = failed or bad
+            print(f"level {level}: {frames} frames, {read} loads ({loads}), "
+                  f"{changes} score changes, {extra} extra HUD renders" + ("  FAIL" if bad else ""))
+    finally:
+        for (module, name), original in zip(patched, originals):
+            setattr(module, name, original)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:2])))